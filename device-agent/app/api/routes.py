@@ -1,15 +1,29 @@
 """Endpoints da API Device Agent"""
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.models.schemas import CommandExecutionRequest, CommandExecutionResult, HealthResponse
-from app.services.command_service import DeviceCommandService
+from functools import lru_cache
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from app.models.schemas import (
+    CommandExecutionRequest,
+    CommandExecutionResult,
+    DeviceHealthStatus,
+    FleetQueryRequest,
+    FleetQueryResponse,
+    HealthResponse,
+    TelemetryChangesRequest,
+    TelemetryChangesResponse,
+    TelemetryReading,
+)
+from app.services.command_service import DeviceCommandService, FleetAggregator
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["Device Commands"])
 
 
+@lru_cache(maxsize=1)
 def get_command_service() -> DeviceCommandService:
-    """Dependency injection do serviço de comandos"""
+    """Dependency injection do serviço de comandos (instância única por processo)"""
     return DeviceCommandService()
 
 
@@ -45,6 +59,248 @@ async def execute_command(
     return result
 
 
+@router.post(
+    "/execute/stream",
+    status_code=status.HTTP_200_OK,
+    summary="Executa um comando de saída extensa em fluxo",
+    description=(
+        "Executa uma operação declarada com saída em fluxo (dump/exportação de logs) e "
+        "repassa a saída do dispositivo em uma resposta chunked à medida que chega"
+    ),
+    response_class=StreamingResponse
+)
+async def execute_stream(
+    request: CommandExecutionRequest,
+    service: DeviceCommandService = Depends(get_command_service)
+) -> StreamingResponse:
+    """
+    Executa uma operação de saída em fluxo em um dispositivo
+
+    - **device_id**: Identificador do dispositivo
+    - **operation**: Nome da operação em fluxo
+    - **parameters**: Dicionário de parâmetros (chave -> valor)
+    """
+    logger.info(
+        f"Recebida requisição de saída em fluxo: device_id={request.device_id}, "
+        f"operation={request.operation}, parameters={request.parameters}"
+    )
+
+    if service.get_stream_config(request.device_id, request.operation) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Operação em fluxo {request.operation} não encontrada para o dispositivo {request.device_id}"
+        )
+
+    success, output = await service.open_stream(
+        request.device_id,
+        request.operation,
+        request.parameters
+    )
+    if not success:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=output)
+
+    return StreamingResponse(output, media_type="text/plain; charset=utf-8")
+
+
+@router.post(
+    "/fleet/query",
+    response_model=FleetQueryResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Executa uma operação de leitura em toda a frota",
+    description=(
+        "Executa a operação de leitura em todos os dispositivos que a suportam, com concorrência "
+        "limitada (operações de controle retornam 400). "
+        "Com stream=true, retorna NDJSON: uma linha por dispositivo e uma linha final de agregados"
+    )
+)
+async def query_fleet(
+    request: FleetQueryRequest,
+    stream: bool = Query(False, description="Transmite os resultados à medida que chegam"),
+    service: DeviceCommandService = Depends(get_command_service)
+):
+    """
+    Executa uma operação de leitura em todos os dispositivos que a suportam
+
+    - **operation**: Nome da operação a executar
+    - **parameters**: Dicionário de parâmetros (chave -> valor)
+    - **device_ids**: Restringe a consulta a estes dispositivos (opcional)
+    - **max_concurrency**: Número máximo de comandos simultâneos
+    """
+    logger.info(
+        f"Recebida consulta à frota: operation={request.operation}, "
+        f"parameters={request.parameters}, stream={stream}"
+    )
+
+    if not service.devices_supporting(request.operation):
+        if service.has_operation(request.operation):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A operação {request.operation} não é de leitura e não pode ser executada na frota"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nenhum dispositivo suporta a operação {request.operation}"
+        )
+
+    aggregator = FleetAggregator()
+    results = service.query_fleet(
+        request.operation,
+        request.parameters,
+        request.device_ids,
+        request.max_concurrency
+    )
+
+    if stream:
+        async def ndjson_lines():
+            async for result in results:
+                aggregator.add(result)
+                yield result.model_dump_json() + "\n"
+            yield aggregator.snapshot().model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    collected = []
+    async for result in results:
+        aggregator.add(result)
+        collected.append(result)
+
+    return FleetQueryResponse(
+        operation=request.operation,
+        results=collected,
+        aggregates=aggregator.snapshot()
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Verifica se algum dos ETags do cabeçalho If-None-Match corresponde ao atual"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+@router.get(
+    "/devices/{device_id}/operations/{operation}",
+    response_model=CommandExecutionResult,
+    status_code=status.HTTP_200_OK,
+    summary="Lê o valor de uma operação de leitura",
+    description=(
+        "Executa uma operação de leitura, com os parâmetros na query string, e retorna o ETag "
+        "da leitura. Com If-None-Match, responde 304 a partir da memória do agente quando "
+        "a última leitura ainda é recente (max_age) e não mudou. Leituras servidas da memória "
+        "vêm com from_cache=true, e restored=true quando vieram do snapshot de uma execução anterior"
+    ),
+    responses={304: {"description": "Leitura não modificada"}}
+)
+async def read_operation(
+    device_id: str,
+    operation: str,
+    request: Request,
+    response: Response,
+    max_age: Optional[float] = Query(None, ge=0, description="Idade máxima aceita da leitura em memória (s)"),
+    if_none_match: Optional[str] = Header(None),
+    service: DeviceCommandService = Depends(get_command_service)
+):
+    """
+    Lê o valor de uma operação de leitura de um dispositivo
+
+    - **device_id**: Identificador do dispositivo
+    - **operation**: Nome da operação de leitura
+    - **max_age**: Idade máxima aceita da leitura em memória, em segundos
+    """
+    if not service.is_read_operation(device_id, operation):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Operação de leitura {operation} não encontrada para o dispositivo {device_id}"
+        )
+
+    parameters = {key: value for key, value in request.query_params.items() if key != "max_age"}
+
+    entry = service.latest_reading(device_id, operation, parameters, max_age)
+    if entry is not None:
+        # Leitura recente em memória: não toca o dispositivo
+        if _etag_matches(if_none_match, entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entry.etag})
+        response.headers["ETag"] = entry.etag
+        return CommandExecutionResult(
+            success=True,
+            data=entry.data,
+            from_cache=True,
+            restored=entry.restored
+        )
+
+    result = await service.execute_command(device_id, operation, parameters)
+    entry = service.matching_reading(device_id, operation, parameters)
+    if result.success and entry is not None:
+        response.headers["ETag"] = entry.etag
+    return result
+
+
+@router.post(
+    "/telemetry/changes",
+    response_model=TelemetryChangesResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Leituras alteradas desde um vetor de versões",
+    description=(
+        "Retorna da memória do agente apenas as leituras (dispositivo, operação, parâmetros) cuja "
+        "versão é mais nova que a informada pelo cliente. Leituras ausentes do vetor contam como versão 0"
+    )
+)
+async def telemetry_changes(
+    request: TelemetryChangesRequest,
+    service: DeviceCommandService = Depends(get_command_service)
+) -> TelemetryChangesResponse:
+    """
+    Lista as leituras alteradas desde o vetor de versões do cliente
+
+    - **versions**: Lista de (device_id, operation, parameters, version) conhecidos pelo cliente
+    - **device_ids**: Restringe a busca a estes dispositivos (opcional)
+    """
+    versions = {
+        (item.device_id, item.operation, tuple(item.parameters)): item.version
+        for item in request.versions
+    }
+    changes = service.telemetry.changed_since(versions, request.device_ids)
+
+    return TelemetryChangesResponse(
+        changes=[
+            TelemetryReading(
+                device_id=entry.device_id,
+                operation=entry.operation,
+                parameters=list(entry.parameters),
+                data=entry.data,
+                value=entry.value,
+                version=entry.version,
+                etag=entry.etag,
+                sampled_at=entry.sampled_at,
+                restored=entry.restored
+            )
+            for entry in changes
+        ]
+    )
+
+
+@router.get(
+    "/devices/health",
+    response_model=List[DeviceHealthStatus],
+    status_code=status.HTTP_200_OK,
+    summary="Latência e saúde por dispositivo",
+    description="Retorna as estatísticas de latência e falhas das chamadas recentes a cada dispositivo"
+)
+async def devices_health(
+    service: DeviceCommandService = Depends(get_command_service)
+) -> List[DeviceHealthStatus]:
+    """
+    Lista a latência e a saúde de cada dispositivo já contatado
+    """
+    return [
+        DeviceHealthStatus(device_id=device_id, **health.to_dict())
+        for device_id, health in service.device_health.items()
+    ]
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
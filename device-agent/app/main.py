@@ -15,13 +15,13 @@
 # - Retornar resposta via HTTP JSON
 # ===========================================================================================
 
-import asyncio
 import logging
-import os
-import random
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI
 from pydantic import BaseModel
+from app.api.routes import get_command_service, router
+from app.services.command_service import DeviceCommandService
 
 # ===========================================================================================
 # CONFIGURAÇÃO DE LOGGING
@@ -35,14 +35,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ===========================================================================================
-# MODO DE SIMULAÇÃO
+# CICLO DE VIDA
 # ===========================================================================================
-# Variável de ambiente para ativar/desativar modo MOCK (sem dispositivos reais)
-# No Docker Compose, definido como MOCK_DEVICES=true
+# Executado na inicialização e no encerramento do servidor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicia as tarefas em segundo plano do serviço de comandos e as encerra no desligamento"""
+    service = get_command_service()
+    await service.start()
+    yield
+    await service.aclose()
 
-MOCK_MODE = os.getenv("MOCK_DEVICES", "true").lower() == "true"
-if MOCK_MODE:
-    logger.info("🔧 Modo MOCK ativado - dispositivos serão simulados")
 
 # ===========================================================================================
 # CONFIGURAÇÃO FASTAPI
@@ -52,7 +56,8 @@ if MOCK_MODE:
 app = FastAPI(
     title="CIoTD Device Agent",
     description="Agente Python para comunicação Telnet com dispositivos IoT",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -78,132 +83,6 @@ class ExecuteCommandResponse(BaseModel):
     error: Optional[str] = None         # Mensagem de erro (se falha)
 
 
-# ===========================================================================================
-# FUNÇÃO: mock_telnet_response
-# ===========================================================================================
-# Simula respostas de dispositivos IoT quando em modo MOCK (sem dispositivos reais)
-# Útil para desenvolvimento e testes sem hardware físico
-# ===========================================================================================
-
-def mock_telnet_response(command: str, params: Dict[str, Any]) -> str:
-    """
-    Retorna resposta simulada para comandos
-    
-    Args:
-        command: Comando a executar (ex: "READ_TEMP")
-        params: Parâmetros do comando (ex: {"zone": "1"})
-        
-    Returns:
-        Resposta simulada do dispositivo
-    """
-    logger.info(f"[MOCK] Executando comando simulado: {command} com parâmetros {params}")
-    
-    # Dicionário de respostas mockadas para diferentes comandos
-    # Cada comando retorna dados aleatórios realisticamente
-    mock_responses = {
-        "READ_TEMP": f"OK TEMP={random.randint(15, 35)}.{random.randint(0, 9)}C",
-        "READ_HUM": f"OK HUMIDITY={random.randint(30, 80)}%",
-        "READ_RAIN": f"OK RAINFALL={random.randint(0, 100)}mm",
-        "READ": f"OK VALUE={random.randint(20, 80)}",
-        "STATUS": f"OK ZONE={params.get('param1', '1')} STATUS=ACTIVE",
-        "START": f"OK ZONE={params.get('param1', '1')} STARTED DURATION={params.get('param2', '30')}min",
-        "STOP": f"OK ZONE={params.get('param1', '1')} STOPPED",
-        "CONFIGURE": f"OK THRESHOLD={params.get('param1', '50')} CONFIGURED"
-    }
-    
-    # Retorna resposta baseada no comando ou resposta genérica se comando desconhecido
-    response = mock_responses.get(command, f"OK {command} EXECUTED")
-    logger.info(f"[MOCK] Resposta simulada: {response}")
-    
-    return response
-
-
-# ===========================================================================================
-# FUNÇÃO ASYNC: send_telnet_command
-# ===========================================================================================
-# Conecta via TCP (Telnet), envia comando formatado e aguarda resposta do dispositivo
-# ===========================================================================================
-
-async def send_telnet_command(
-    host: str, 
-    port: int, 
-    command: str, 
-    params: Dict[str, Any],
-    timeout: float = 5.0
-) -> str:
-    """
-    Conecta via TCP (Telnet), envia comando formatado e retorna resposta.
-    
-    Formato do comando: comando param1 param2 ... \r
-    Formato da resposta: string terminada em \r
-    
-    Args:
-        host: IP ou hostname do dispositivo
-        port: Porta Telnet (geralmente 23)
-        command: Comando a executar (ex: "READ_TEMP")
-        params: Dicionário de parâmetros
-        timeout: Tempo máximo de espera em segundos
-        
-    Returns:
-        Resposta do dispositivo sem o \r final
-        
-    Raises:
-        HTTPException: Em caso de timeout ou erro de conexão
-    """
-    # Se estiver em modo mock, retorna dados simulados (não conecta ao dispositivo real)
-    if MOCK_MODE:
-        return mock_telnet_response(command, params)
-    
-    # PASSO 1: Construir string de comando no formato: "comando param1 param2\r"
-    param_values = [str(v) for v in params.values()] if params else []
-    command_str = command
-    if param_values:
-        command_str = f"{command} {' '.join(param_values)}"
-    command_str += "\r"  # Adiciona terminador de linha (carriage return)
-    
-    logger.info(f"Conectando a {host}:{port} para enviar: {repr(command_str)}")
-    
-    try:
-        # PASSO 2: Abrir conexão TCP assíncrona (Telnet é TCP na porta 23)
-        # asyncio.open_connection retorna um reader (para ler) e writer (para escrever)
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(host, port),
-            timeout=timeout  # Timeout para a conexão
-        )
-        
-        # PASSO 3: Enviar comando para o dispositivo
-        writer.write(command_str.encode('utf-8'))  # Converte string para bytes UTF-8
-        await writer.drain()  # Aguarda os dados serem realmente enviados
-        logger.info(f"Comando enviado: {repr(command_str)}")
-        
-        # PASSO 4: Aguardar resposta terminada em \r (carriage return)
-        # readuntil lê bytes até encontrar o delimitador especificado
-        response_bytes = await asyncio.wait_for(
-            reader.readuntil(b'\r'),  # Lê até encontrar \r
-            timeout=timeout  # Timeout para a resposta
-        )
-        
-        # PASSO 5: Converter resposta de bytes para string e remover o \r final
-        response = response_bytes.decode('utf-8').rstrip('\r')
-        logger.info(f"Resposta recebida: {repr(response)}")
-        
-        # PASSO 6: Fechar conexão TCP graciosamente
-        writer.close()
-        await writer.wait_closed()
-        
-        # PASSO 7: Retornar a resposta do dispositivo
-        return response
-        
-    except asyncio.TimeoutError:
-        # Timeout ao conectar ou aguardar resposta
-        logger.error(f"Timeout ao conectar/aguardar resposta de {host}:{port}")
-        raise HTTPException(status_code=504, detail="Timeout na comunicação com dispositivo")
-    except Exception as e:
-        # Qualquer outro erro (conexão recusada, dispositivo offline, etc)
-        logger.error(f"Erro na comunicação Telnet: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro Telnet: {str(e)}")
-
-
 # ===========================================================================================
 # ENDPOINT: POST /api/execute
 # ===========================================================================================
@@ -211,9 +90,15 @@ async def send_telnet_command(
 # ===========================================================================================
 
 @app.post("/api/execute", response_model=ExecuteCommandResponse)
-async def execute_command(request: ExecuteCommandRequest):
+async def execute_command(
+    request: ExecuteCommandRequest,
+    service: DeviceCommandService = Depends(get_command_service)
+):
     """
     Executa comando em dispositivo IoT via Telnet (TCP).
+
+    Cada host:porta tem um token bucket (ver rate_limiter_for_host): sem token
+    disponível, o comando aguarda antes de ser enviado ao dispositivo.
     
     Recebe:
         - device_id: identificador do dispositivo
@@ -225,37 +110,34 @@ async def execute_command(request: ExecuteCommandRequest):
     Retorna:
         - success: true/false
         - response: resposta do dispositivo (se sucesso)
-        - error: mensagem de erro (se falha)
+        - error: mensagem de erro (se falha; timeouts e falhas de conexão também
+          retornam HTTP 200 com success=false)
     """
     logger.info(
         f"Executando comando no dispositivo {request.device_id}: "
         f"{request.command} com parâmetros {request.parameters}"
     )
     
-    try:
-        # Envia comando via Telnet (ou mock se MOCK_MODE=true)
-        response = await send_telnet_command(
-            host=request.device_host,
-            port=request.device_port,
-            command=request.command,
-            params=request.parameters
-        )
-        
-        # Retorna resposta de sucesso
-        return ExecuteCommandResponse(
-            success=True,
-            response=response
-        )
-    except HTTPException:
-        # Re-lança HTTPException (já tem código de status correto)
-        raise
-    except Exception as e:
-        # Qualquer outro erro - retorna como resposta de falha
-        logger.error(f"Erro ao executar comando: {e}")
-        return ExecuteCommandResponse(
-            success=False,
-            error=str(e)
-        )
+    # Respeita o limite de taxa do dispositivo (alguns controladores travam acima de poucos comandos/s)
+    limiter = service.rate_limiter_for_host(request.device_host, request.device_port)
+    if limiter and not limiter.try_acquire():
+        logger.info(f"Limite de taxa de {request.device_host}:{request.device_port}: aguardando token")
+        await limiter.acquire()
+
+    # Mesmo transporte do serviço de comandos: mock, filtro IAC, cache de endereços e
+    # gravação/reprodução de tráfego (DEVICE_TRAFFIC_MODE)
+    host = f"[{request.device_host}]" if ":" in request.device_host else request.device_host
+    success, response = await service.telnet_client.execute_command(
+        f"telnet://{host}:{request.device_port}",
+        request.command,
+        [str(value) for value in request.parameters.values()]
+    )
+
+    if success:
+        return ExecuteCommandResponse(success=True, response=response)
+
+    logger.error(f"Erro ao executar comando: {response}")
+    return ExecuteCommandResponse(success=False, error=response)
 
 
 # ===========================================================================================
@@ -278,6 +160,15 @@ async def root():
     }
 
 
+# ===========================================================================================
+# ROTAS DO SERVIÇO DE COMANDOS
+# ===========================================================================================
+# Incluídas depois dos endpoints acima: /api/execute e /api/health deste arquivo têm precedência
+# e o router adiciona os endpoints baseados no registro de dispositivos (ex: /api/fleet/query)
+
+app.include_router(router)
+
+
 # ===========================================================================================
 # INICIALIZAÇÃO DO SERVIDOR
 # ===========================================================================================
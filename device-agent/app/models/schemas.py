@@ -1,6 +1,6 @@
 """Models para a API Device Agent"""
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
 
 
 class CommandExecutionRequest(BaseModel):
@@ -16,9 +16,90 @@ class CommandExecutionResult(BaseModel):
     data: Optional[str] = None
     error: Optional[str] = None
     execution_time_ms: int = 0
+    coalesced: bool = False  # Resultado compartilhado de outra leitura (limite de taxa)
+    from_cache: bool = False  # Resultado servido da memória do agente, sem tocar o dispositivo
+    restored: bool = False  # Leitura da memória restaurada do snapshot de uma execução anterior
 
 
 class HealthResponse(BaseModel):
     """Resposta de health check"""
     status: str
     message: str
+
+
+class FleetQueryRequest(BaseModel):
+    """Requisição para executar uma operação em todos os dispositivos que a suportam"""
+    operation: str
+    parameters: Dict[str, str] = {}
+    device_ids: Optional[List[str]] = None
+    max_concurrency: int = Field(default=8, ge=1, le=64)
+
+
+class FleetDeviceResult(BaseModel):
+    """Resultado da operação em um dispositivo da frota"""
+    device_id: str
+    success: bool
+    data: Optional[str] = None
+    value: Optional[float] = None
+    error: Optional[str] = None
+    execution_time_ms: int = 0
+
+
+class FleetAggregates(BaseModel):
+    """Agregados calculados à medida que os resultados chegam"""
+    count: int = 0
+    failures: int = 0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+
+
+class FleetQueryResponse(BaseModel):
+    """Resposta consolidada de uma consulta à frota"""
+    operation: str
+    results: List[FleetDeviceResult]
+    aggregates: FleetAggregates
+
+
+class TelemetryVersion(BaseModel):
+    """Versão conhecida pelo cliente de uma leitura de um dispositivo"""
+    device_id: str
+    operation: str
+    parameters: List[str] = []  # Valores dos parâmetros na ordem do comando
+    version: int
+
+
+class TelemetryChangesRequest(BaseModel):
+    """Vetor de versões do cliente para consulta de leituras alteradas"""
+    versions: List[TelemetryVersion] = []
+    device_ids: Optional[List[str]] = None
+
+
+class TelemetryReading(BaseModel):
+    """Última leitura guardada na memória do agente"""
+    device_id: str
+    operation: str
+    parameters: List[str] = []  # Valores dos parâmetros na ordem do comando
+    data: str
+    value: Optional[float] = None
+    version: int
+    etag: str
+    sampled_at: float
+    restored: bool = False
+
+
+class TelemetryChangesResponse(BaseModel):
+    """Leituras alteradas desde o vetor de versões do cliente"""
+    changes: List[TelemetryReading]
+
+
+class DeviceHealthStatus(BaseModel):
+    """Latência e saúde das chamadas recentes a um dispositivo"""
+    device_id: str
+    latency_ewma_ms: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_success_at: Optional[float] = None
+    last_failure_at: Optional[float] = None
+    last_error: Optional[str] = None
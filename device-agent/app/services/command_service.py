@@ -1,13 +1,92 @@
 """Serviço de orquestração de comandos em dispositivos"""
 import logging
 import asyncio
+import hashlib
+import json
+import os
+import re
 import time
-from typing import Dict, Optional
-from app.models.schemas import CommandExecutionResult
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+from app.models.schemas import CommandExecutionResult, FleetAggregates, FleetDeviceResult
+from app.services.device_health import DeviceHealth
+from app.services.rate_limiter import TokenBucket, build_rate_limiters
+from app.services.state_snapshot import StateSnapshotFile
+from app.services.telemetry_push import TelemetryPushPipeline
+from app.services.telemetry_store import TelemetryEntry, TelemetryStore
 from app.services.telnet_client import TelnetDeviceClient
 
 logger = logging.getLogger(__name__)
 
+# Primeiro valor numérico após "=" na resposta (ex: "OK TEMP=23.4C" -> 23.4)
+_NUMERIC_VALUE_PATTERN = re.compile(r"=\s*(-?\d+(?:\.\d+)?)")
+
+# Campos de DeviceHealth por tipo, para validar o snapshot
+_HEALTH_COUNTERS = ("successes", "failures", "consecutive_failures")
+_HEALTH_OPTIONAL_NUMBERS = ("latency_ewma_ms", "last_success_at", "last_failure_at")
+
+
+def parse_numeric_value(response: Optional[str]) -> Optional[float]:
+    """
+    Extrai o valor numérico de uma resposta de dispositivo
+
+    Args:
+        response: Resposta do dispositivo (ex: "OK TEMP=23.4C")
+
+    Returns:
+        Valor numérico ou None se a resposta não contiver número
+    """
+    if not response:
+        return None
+    match = _NUMERIC_VALUE_PATTERN.search(response)
+    return float(match.group(1)) if match else None
+
+
+class FleetAggregator:
+    """Calcula agregados (count, min, max, mean, failures) incrementalmente"""
+
+    def __init__(self):
+        """Inicializa os acumuladores"""
+        self.count = 0
+        self.failures = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self._total = 0.0
+
+    def add(self, result: FleetDeviceResult) -> None:
+        """
+        Incorpora um resultado aos agregados
+
+        Args:
+            result: Resultado de um dispositivo da frota
+        """
+        if not result.success:
+            self.failures += 1
+            return
+        if result.value is None:
+            return
+
+        self.count += 1
+        self._total += result.value
+        if self.minimum is None or result.value < self.minimum:
+            self.minimum = result.value
+        if self.maximum is None or result.value > self.maximum:
+            self.maximum = result.value
+
+    def snapshot(self) -> FleetAggregates:
+        """
+        Retorna os agregados calculados até o momento
+
+        Returns:
+            Agregados da consulta
+        """
+        return FleetAggregates(
+            count=self.count,
+            failures=self.failures,
+            min=self.minimum,
+            max=self.maximum,
+            mean=self._total / self.count if self.count else None
+        )
+
 
 class DeviceCommandService:
     """Serviço para orquestrar a execução de comandos em dispositivos"""
@@ -17,6 +96,218 @@ class DeviceCommandService:
         self.telnet_client = TelnetDeviceClient(timeout=10.0)
         # Mock de dispositivos e seus comandos
         self.devices = self._load_mock_devices()
+        # Índice invertido: operação de leitura -> dispositivos que a suportam
+        self.operation_index = self._build_operation_index(self.devices)
+        # Token bucket por dispositivo (campo "rate_limit" do registro)
+        self.rate_limiters = build_rate_limiters(self.devices)
+        # Buckets por host:porta para /api/execute do backend (dispositivos do registro compartilham o seu)
+        self.host_rate_limiters: Dict[Tuple[str, int], TokenBucket] = {
+            TelnetDeviceClient._parse_device_url(self.devices[device_id].get("url", "telnet://localhost:23")): limiter
+            for device_id, limiter in self.rate_limiters.items()
+        }
+        self.default_rate_per_s = float(os.getenv("DEVICE_RATE_LIMIT_PER_S", "2"))
+        self.default_rate_burst = int(os.getenv("DEVICE_RATE_LIMIT_BURST", "2"))
+        # Leituras em andamento e concluídas recentemente, compartilhadas quando o limite estoura
+        self._inflight_reads: Dict[Tuple, asyncio.Future] = {}
+        self._recent_reads: Dict[Tuple, Tuple[float, Tuple[bool, Optional[str]]]] = {}
+        # Memória dos últimos valores lidos (ETag / versões)
+        self.telemetry = TelemetryStore()
+        self.telemetry_max_age_s = float(os.getenv("TELEMETRY_MAX_AGE_S", "5"))
+        # Idade máxima das leituras restauradas do snapshot (até a primeira leitura real)
+        self.restored_max_age_s = float(os.getenv("STATE_RESTORED_MAX_AGE_S", "300"))
+        # Envio opcional dos resultados ao backend (TELEMETRY_PUSH_URL) e leituras periódicas
+        self.push_pipeline = TelemetryPushPipeline.from_env()
+        self.poll_interval_s = float(os.getenv("TELEMETRY_POLL_INTERVAL_S", "0"))
+        self._poll_task: Optional[asyncio.Task] = None
+        # Latência e saúde por dispositivo
+        self.device_health: Dict[str, DeviceHealth] = {}
+        # Snapshot local do estado para reinícios rápidos (STATE_SNAPSHOT_PATH)
+        self.registry_fingerprint = self._fingerprint_registry(self.devices)
+        self.snapshot_file = StateSnapshotFile.from_env()
+        self.snapshot_interval_s = float(os.getenv("STATE_SNAPSHOT_INTERVAL_S", "30"))
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Inicia as tarefas em segundo plano (snapshot, envio de telemetria e leituras periódicas)"""
+        if self.snapshot_file:
+            # A restauração não bloqueia a inicialização: o agente atende frio até ela terminar
+            self._snapshot_task = asyncio.create_task(self._run_snapshots())
+        if self.push_pipeline:
+            await self.push_pipeline.start()
+        if self.poll_interval_s > 0:
+            self._poll_task = asyncio.create_task(self._poll_reads())
+
+    async def aclose(self) -> None:
+        """Encerra as tarefas em segundo plano e libera os recursos do serviço"""
+        await self._cancel_task(self._poll_task)
+        self._poll_task = None
+        if self.push_pipeline:
+            await self.push_pipeline.stop()
+        if self.snapshot_file:
+            await self._cancel_task(self._snapshot_task)
+            self._snapshot_task = None
+            await self.save_snapshot()
+        self.telnet_client.close()
+
+    @staticmethod
+    async def _cancel_task(task: Optional[asyncio.Task]) -> None:
+        """
+        Cancela uma tarefa em segundo plano e aguarda o término
+
+        Uma tarefa que já havia terminado com erro tem o erro registrado no log,
+        sem interromper o encerramento do serviço.
+        """
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.error(f"Tarefa em segundo plano {task.get_name()} terminou com erro", exc_info=True)
+
+    def export_state(self) -> Dict:
+        """
+        Serializa o estado em memória que acelera um reinício
+
+        Returns:
+            Endereços resolvidos, saúde dos dispositivos e últimas leituras
+        """
+        return {
+            "resolved_addresses": self.telnet_client.export_addresses(),
+            "device_health": {
+                device_id: health.to_dict() for device_id, health in self.device_health.items()
+            },
+            "readings": self.telemetry.export(),
+        }
+
+    def restore_state(self, state: Dict, registry_matches: bool) -> None:
+        """
+        Restaura um estado serializado sem sobrescrever dados mais novos
+
+        Leituras e saúde de dispositivos ou operações que não existem mais no
+        registro são descartadas. Endereços resolvidos expirados, ou todos se o
+        registro mudou, também são descartados.
+
+        Args:
+            state: Estado no formato de export_state()
+            registry_matches: Se o registro é o mesmo do snapshot
+
+        Raises:
+            ValueError: Se a estrutura do estado for inválida (nada é restaurado)
+        """
+        self._validate_state(state)
+
+        addresses = 0
+        if registry_matches:
+            addresses = self.telnet_client.restore_addresses(state.get("resolved_addresses", {}))
+
+        for device_id, health in state.get("device_health", {}).items():
+            if device_id in self.devices and device_id not in self.device_health:
+                self.device_health[device_id] = DeviceHealth.from_dict(health)
+
+        readings = [
+            reading for reading in state.get("readings", [])
+            if self._get_command_for_operation(reading["device_id"], reading["operation"])
+        ]
+        restored = self.telemetry.restore(readings)
+
+        logger.info(
+            f"Estado restaurado do snapshot: {restored} leituras, "
+            f"{len(self.device_health)} dispositivos com estatísticas, "
+            f"{addresses} hosts com endereços resolvidos"
+        )
+
+    @staticmethod
+    def _validate_state(state: Dict) -> None:
+        """
+        Verifica a estrutura de um estado serializado antes de restaurá-lo
+
+        Args:
+            state: Estado no formato de export_state()
+
+        Raises:
+            ValueError: Se alguma seção ou campo tiver tipo inesperado
+        """
+        def is_number(value, optional: bool = False) -> bool:
+            if value is None:
+                return optional
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+        def is_text_list(value) -> bool:
+            return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+        if not isinstance(state, dict):
+            raise ValueError("estado deve ser um objeto")
+
+        addresses = state.get("resolved_addresses", {})
+        if not isinstance(addresses, dict):
+            raise ValueError("resolved_addresses deve ser um objeto")
+        for host, cached in addresses.items():
+            if not (
+                isinstance(cached, dict)
+                and is_text_list(cached.get("addresses"))
+                and is_number(cached.get("expires_at"))
+            ):
+                raise ValueError(f"endereços resolvidos inválidos para {host}")
+
+        health = state.get("device_health", {})
+        if not isinstance(health, dict):
+            raise ValueError("device_health deve ser um objeto")
+        for device_id, stats in health.items():
+            if not (
+                isinstance(stats, dict)
+                and all(
+                    isinstance(stats.get(name, 0), int) and not isinstance(stats.get(name, 0), bool)
+                    for name in _HEALTH_COUNTERS
+                )
+                and all(is_number(stats.get(name), optional=True) for name in _HEALTH_OPTIONAL_NUMBERS)
+                and isinstance(stats.get("last_error"), (str, type(None)))
+            ):
+                raise ValueError(f"estatísticas inválidas para {device_id}")
+
+        readings = state.get("readings", [])
+        if not isinstance(readings, list):
+            raise ValueError("readings deve ser uma lista")
+        for reading in readings:
+            if not (
+                isinstance(reading, dict)
+                and isinstance(reading.get("device_id"), str)
+                and isinstance(reading.get("operation"), str)
+                and is_text_list(reading.get("parameters"))
+                and isinstance(reading.get("data"), str)
+                and is_number(reading.get("value"), optional=True)
+                and is_number(reading.get("sampled_at"))
+                and isinstance(reading.get("version"), int)
+                and not isinstance(reading.get("version"), bool)
+            ):
+                raise ValueError(f"leitura inválida: {str(reading)[:80]}")
+
+    async def save_snapshot(self) -> None:
+        """Grava o snapshot do estado (a escrita em disco ocorre fora do loop de eventos)"""
+        try:
+            size = await asyncio.to_thread(
+                self.snapshot_file.save,
+                self.export_state(),
+                self.registry_fingerprint
+            )
+            logger.debug(f"Snapshot do estado gravado: {size} bytes")
+        except OSError as e:
+            logger.warning(f"Falha ao gravar snapshot do estado: {e}")
+
+    async def _run_snapshots(self) -> None:
+        """Restaura o snapshot existente e depois grava um novo periodicamente"""
+        snapshot = await asyncio.to_thread(self.snapshot_file.load, self.registry_fingerprint)
+        if snapshot is not None:
+            try:
+                self.restore_state(snapshot["state"], snapshot["registry_matches"])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Snapshot do estado inválido, ignorado: {e}")
+
+        while True:
+            await asyncio.sleep(self.snapshot_interval_s)
+            await self.save_snapshot()
 
     async def execute_command(
         self,
@@ -37,6 +328,32 @@ class DeviceCommandService:
         Returns:
             Resultado da execução
         """
+        result = await self._execute_command(device_id, operation, parameters, device_url)
+
+        # Resultados compartilhados já foram enviados por quem executou a leitura
+        if self.push_pipeline and not result.coalesced:
+            self.push_pipeline.submit({
+                "device_id": device_id,
+                "operation": operation,
+                "parameters": dict(parameters),
+                "success": result.success,
+                "data": result.data,
+                "value": parse_numeric_value(result.data) if result.success else None,
+                "error": result.error,
+                "execution_time_ms": result.execution_time_ms,
+                "timestamp": time.time()
+            })
+
+        return result
+
+    async def _execute_command(
+        self,
+        device_id: str,
+        operation: str,
+        parameters: Dict[str, str],
+        device_url: Optional[str]
+    ) -> CommandExecutionResult:
+        """Executa o comando (ver execute_command)"""
         start_time = time.time()
 
         try:
@@ -62,6 +379,13 @@ class DeviceCommandService:
                     execution_time_ms=int((time.time() - start_time) * 1000)
                 )
 
+            if self.get_stream_config(device_id, operation) is not None:
+                return CommandExecutionResult(
+                    success=False,
+                    error=f"Operação {operation} gera saída em fluxo; use /api/execute/stream",
+                    execution_time_ms=int((time.time() - start_time) * 1000)
+                )
+
             # Monta o comando com parâmetros
             command_string = command_info["command"]
             param_list = self._build_parameter_list(command_info, parameters)
@@ -71,13 +395,26 @@ class DeviceCommandService:
                 f"operação={operation}, comando={command_string}, parâmetros={param_list}"
             )
 
-            # Executa via Telnet/TCP
-            success, response = await self.telnet_client.execute_command(
+            # Executa via Telnet/TCP respeitando o limite de taxa do dispositivo
+            is_read = self.is_read_operation(device_id, operation)
+            success, response, coalesced = await self._execute_rate_limited(
+                device_id,
+                operation,
+                is_read,
                 device_url,
                 command_string,
                 param_list
             )
 
+            if success and is_read and not coalesced:
+                self.telemetry.update(
+                    device_id,
+                    operation,
+                    tuple(param_list),
+                    response,
+                    parse_numeric_value(response)
+                )
+
             execution_time_ms = int((time.time() - start_time) * 1000)
 
             if success:
@@ -88,7 +425,8 @@ class DeviceCommandService:
                 return CommandExecutionResult(
                     success=True,
                     data=response,
-                    execution_time_ms=execution_time_ms
+                    execution_time_ms=execution_time_ms,
+                    coalesced=coalesced
                 )
             else:
                 logger.error(f"Erro ao executar comando: {response}")
@@ -108,6 +446,386 @@ class DeviceCommandService:
                 execution_time_ms=execution_time_ms
             )
 
+    async def _poll_reads(self) -> None:
+        """
+        Executa periodicamente todas as operações de leitura da frota
+
+        Os resultados passam por execute_command, então atualizam a memória de
+        últimos valores e seguem para o envio de telemetria.
+        """
+        targets = self._build_poll_targets(self.devices)
+        logger.info(
+            f"Leituras periódicas a cada {self.poll_interval_s}s: "
+            f"{[f'{device_id}/{operation}' for device_id, operation, _ in targets]}"
+        )
+        semaphore = asyncio.Semaphore(8)
+
+        async def poll(device_id: str, operation: str, parameters: Dict[str, str]) -> None:
+            async with semaphore:
+                await self.execute_command(device_id, operation, parameters)
+
+        while True:
+            await asyncio.gather(*(poll(*target) for target in targets))
+            await asyncio.sleep(self.poll_interval_s)
+
+    async def open_stream(
+        self,
+        device_id: str,
+        operation: str,
+        parameters: Dict[str, str]
+    ) -> Tuple[bool, Union[AsyncIterator[bytes], str]]:
+        """
+        Inicia uma operação de saída em fluxo (declarada com "stream" no registro)
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+            parameters: Dicionário de parâmetros
+
+        Returns:
+            Tupla (True, iterador de blocos) ou (False, mensagem de erro)
+        """
+        stream_config = self.get_stream_config(device_id, operation)
+        if stream_config is None:
+            return False, f"Operação em fluxo {operation} não encontrada para o dispositivo {device_id}"
+
+        command_info = self._get_command_for_operation(device_id, operation)
+        param_list = self._build_parameter_list(command_info, parameters)
+
+        logger.info(
+            f"Iniciando saída em fluxo no dispositivo {device_id}: "
+            f"operação={operation}, comando={command_info['command']}, parâmetros={param_list}"
+        )
+
+        limiter = self.rate_limiters.get(device_id)
+        if limiter:
+            await limiter.acquire()
+
+        return await self.telnet_client.open_stream(
+            self.devices[device_id].get("url", "telnet://localhost:23"),
+            command_info["command"],
+            param_list,
+            end_marker=stream_config.get("end_marker"),
+            idle_timeout=float(stream_config.get("idle_timeout_s", 2.0)),
+            chunk_size=int(stream_config.get("chunk_size", 4096))
+        )
+
+    def rate_limiter_for_host(self, host: str, port: int) -> Optional[TokenBucket]:
+        """
+        Obtém o token bucket de um dispositivo endereçado por host e porta
+
+        Usado pelo /api/execute chamado pelo backend, que não conhece o registro.
+        Um host:porta do registro usa o bucket do dispositivo correspondente; os
+        demais recebem um bucket próprio com DEVICE_RATE_LIMIT_PER_S e
+        DEVICE_RATE_LIMIT_BURST (taxa 0 desativa o limite).
+
+        Args:
+            host: IP ou hostname do dispositivo
+            port: Porta Telnet
+
+        Returns:
+            Token bucket ou None se não houver limite
+        """
+        key = (host, port)
+        limiter = self.host_rate_limiters.get(key)
+        if limiter is None and self.default_rate_per_s > 0:
+            limiter = TokenBucket(rate=self.default_rate_per_s, burst=self.default_rate_burst)
+            self.host_rate_limiters[key] = limiter
+        return limiter
+
+    def get_stream_config(self, device_id: str, operation: str) -> Optional[Dict]:
+        """
+        Obtém a configuração de saída em fluxo de uma operação
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+
+        Returns:
+            Dicionário com end_marker/idle_timeout_s/chunk_size ou None se a operação não for em fluxo
+        """
+        for cmd in self.devices.get(device_id, {}).get("commands", []):
+            if cmd["operation"] == operation:
+                return cmd.get("stream")
+        return None
+
+    async def _execute_rate_limited(
+        self,
+        device_id: str,
+        operation: str,
+        is_read: bool,
+        device_url: str,
+        command_string: str,
+        param_list: list[str]
+    ) -> Tuple[bool, Optional[str], bool]:
+        """
+        Executa o comando consumindo um token do dispositivo
+
+        Sem token disponível, uma leitura compartilha o resultado da mesma leitura
+        em andamento ou recém-concluída (dentro do intervalo de reposição de um
+        token) em vez de enfileirar outra chamada ao dispositivo. Comandos de
+        controle sempre aguardam o token.
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+            is_read: Se a operação é de leitura
+            device_url: URL do dispositivo
+            command_string: Comando a executar
+            param_list: Lista de parâmetros
+
+        Returns:
+            Tupla (sucesso, resposta, compartilhado)
+        """
+        key = (device_id, operation, tuple(param_list))
+        limiter = self.rate_limiters.get(device_id)
+
+        has_token = limiter is None or limiter.try_acquire()
+
+        if not is_read:
+            if not has_token:
+                logger.info(f"Limite de taxa de {device_id}: aguardando token")
+                await limiter.acquire()
+            success, response = await self._call_device(
+                device_id,
+                device_url,
+                command_string,
+                param_list
+            )
+            return success, response, False
+
+        if not has_token:
+            inflight = self._inflight_reads.get(key)
+            if inflight is not None:
+                logger.info(f"Limite de taxa de {device_id}: compartilhando leitura em andamento")
+                try:
+                    success, response = await asyncio.shield(inflight)
+                    return success, response, True
+                except asyncio.CancelledError:
+                    # A leitura compartilhada foi cancelada: segue aguardando o próprio token
+                    if not inflight.cancelled():
+                        raise
+
+            recent = self._recent_reads.get(key)
+            if recent and time.monotonic() - recent[0] <= limiter.refill_interval:
+                logger.info(f"Limite de taxa de {device_id}: compartilhando leitura recente")
+                success, response = recent[1]
+                return success, response, True
+
+        # Registrada antes de aguardar o token: leituras idênticas que chegarem
+        # durante a espera compartilham esta em vez de enfileirar outra chamada
+        inflight = asyncio.get_running_loop().create_future()
+        self._inflight_reads[key] = inflight
+        try:
+            if not has_token:
+                logger.info(f"Limite de taxa de {device_id}: aguardando token")
+                await limiter.acquire()
+            success, response = await self._call_device(
+                device_id,
+                device_url,
+                command_string,
+                param_list
+            )
+            inflight.set_result((success, response))
+            if success:
+                self._recent_reads[key] = (time.monotonic(), (success, response))
+            return success, response, False
+        finally:
+            if not inflight.done():
+                inflight.cancel()
+            if self._inflight_reads.get(key) is inflight:
+                del self._inflight_reads[key]
+
+    async def _call_device(
+        self,
+        device_id: str,
+        device_url: str,
+        command_string: str,
+        param_list: list[str]
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Executa o comando no dispositivo e atualiza suas estatísticas de saúde
+
+        Args:
+            device_id: Identificador do dispositivo
+            device_url: URL do dispositivo
+            command_string: Comando a executar
+            param_list: Lista de parâmetros
+
+        Returns:
+            Tupla (sucesso, resposta)
+        """
+        start_time = time.monotonic()
+        success, response = await self.telnet_client.execute_command(
+            device_url,
+            command_string,
+            param_list
+        )
+        self.device_health.setdefault(device_id, DeviceHealth()).record(
+            success,
+            (time.monotonic() - start_time) * 1000,
+            None if success else response
+        )
+        return success, response
+
+    def latest_reading(
+        self,
+        device_id: str,
+        operation: str,
+        parameters: Dict[str, str],
+        max_age_s: Optional[float] = None
+    ) -> Optional[TelemetryEntry]:
+        """
+        Retorna a última leitura guardada, se for recente o suficiente
+
+        Leituras restauradas do snapshot, que ainda não foram substituídas por uma
+        leitura real, usam STATE_RESTORED_MAX_AGE_S como idade máxima padrão.
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+            parameters: Dicionário de parâmetros
+            max_age_s: Idade máxima aceita em segundos (padrão: TELEMETRY_MAX_AGE_S,
+                ou STATE_RESTORED_MAX_AGE_S para leituras restauradas)
+
+        Returns:
+            Entrada da memória ou None se não houver leitura recente com os mesmos parâmetros
+        """
+        entry = self.matching_reading(device_id, operation, parameters)
+        if entry is None:
+            return None
+
+        if max_age_s is None:
+            max_age_s = self.restored_max_age_s if entry.restored else self.telemetry_max_age_s
+        return entry if entry.age() <= max_age_s else None
+
+    def matching_reading(
+        self,
+        device_id: str,
+        operation: str,
+        parameters: Dict[str, str]
+    ) -> Optional[TelemetryEntry]:
+        """
+        Retorna a última leitura guardada com os mesmos parâmetros, de qualquer idade
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+            parameters: Dicionário de parâmetros
+
+        Returns:
+            Entrada da memória ou None se não houver leitura com estes parâmetros
+        """
+        command_info = self._get_command_for_operation(device_id, operation)
+        if command_info is None:
+            return None
+
+        return self.telemetry.get(
+            device_id,
+            operation,
+            tuple(self._build_parameter_list(command_info, parameters))
+        )
+
+    def is_read_operation(self, device_id: str, operation: str) -> bool:
+        """
+        Verifica se a operação é de leitura (campo "kind" do registro)
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+
+        Returns:
+            True se a operação for de leitura
+        """
+        for cmd in self.devices.get(device_id, {}).get("commands", []):
+            if cmd["operation"] == operation:
+                return cmd.get("kind", "control") == "read"
+        return False
+
+    def has_operation(self, operation: str) -> bool:
+        """
+        Verifica se algum dispositivo do registro declara a operação (de qualquer tipo)
+
+        Args:
+            operation: Nome da operação
+
+        Returns:
+            True se a operação existe no registro
+        """
+        return any(
+            cmd["operation"] == operation
+            for device in self.devices.values()
+            for cmd in device.get("commands", [])
+        )
+
+    def devices_supporting(self, operation: str) -> list[str]:
+        """
+        Lista os dispositivos que suportam uma operação de leitura
+
+        Args:
+            operation: Nome da operação
+
+        Returns:
+            Lista de identificadores de dispositivos
+        """
+        return list(self.operation_index.get(operation, []))
+
+    async def query_fleet(
+        self,
+        operation: str,
+        parameters: Dict[str, str],
+        device_ids: Optional[list[str]] = None,
+        max_concurrency: int = 8
+    ) -> AsyncIterator[FleetDeviceResult]:
+        """
+        Executa uma operação de leitura em todos os dispositivos que a suportam
+
+        Operações de controle e em fluxo não fazem parte do índice, então nunca
+        são disparadas para a frota. Os resultados são entregues na ordem em que ficam prontos, com no
+        máximo max_concurrency comandos em andamento ao mesmo tempo.
+
+        Args:
+            operation: Nome da operação
+            parameters: Dicionário de parâmetros
+            device_ids: Restringe a consulta a estes dispositivos (opcional)
+            max_concurrency: Número máximo de comandos simultâneos
+
+        Yields:
+            Resultado de cada dispositivo
+        """
+        targets = self.devices_supporting(operation)
+        if device_ids is not None:
+            requested = set(device_ids)
+            targets = [device_id for device_id in targets if device_id in requested]
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(device_id: str) -> FleetDeviceResult:
+            async with semaphore:
+                result = await self.execute_command(device_id, operation, parameters)
+            return FleetDeviceResult(
+                device_id=device_id,
+                success=result.success,
+                data=result.data,
+                value=parse_numeric_value(result.data) if result.success else None,
+                error=result.error,
+                execution_time_ms=result.execution_time_ms
+            )
+
+        logger.info(
+            f"Consulta à frota: operação={operation}, dispositivos={len(targets)}, "
+            f"concorrência={max_concurrency}"
+        )
+
+        tasks = [asyncio.create_task(run(device_id)) for device_id in targets]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Cliente desconectou ou consulta interrompida: cancela o restante
+            for task in tasks:
+                task.cancel()
+
     def _get_command_for_operation(self, device_id: str, operation: str) -> Optional[Dict]:
         """
         Obtém informações do comando para uma operação
@@ -151,6 +869,68 @@ class DeviceCommandService:
 
         return param_list
 
+    @staticmethod
+    def _fingerprint_registry(devices: Dict) -> str:
+        """
+        Calcula a impressão digital do registro de dispositivos
+
+        Args:
+            devices: Dicionário de dispositivos
+
+        Returns:
+            Hash SHA-256 do registro serializado de forma canônica
+        """
+        canonical = json.dumps(devices, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _build_operation_index(devices: Dict) -> Dict[str, list[str]]:
+        """
+        Constrói o índice invertido de operação de leitura para dispositivos
+
+        Apenas comandos com "kind": "read" entram no índice.
+
+        Args:
+            devices: Dicionário de dispositivos
+
+        Returns:
+            Dicionário operação -> lista de identificadores de dispositivos
+        """
+        index: Dict[str, list[str]] = {}
+        for device_id, device in devices.items():
+            for cmd in device.get("commands", []):
+                if cmd.get("kind", "control") == "read":
+                    index.setdefault(cmd["operation"], []).append(device_id)
+        return index
+
+    @staticmethod
+    def _build_poll_targets(devices: Dict) -> list[Tuple[str, str, Dict[str, str]]]:
+        """
+        Lista as leituras executadas periodicamente
+
+        Uma operação de leitura sem parâmetros é lida como está. Uma operação com
+        parâmetros é lida com cada conjunto declarado em "poll_parameters" no
+        registro (ex: [{"zone": "1"}, {"zone": "2"}]) e ignorada se não houver nenhum.
+
+        Args:
+            devices: Dicionário de dispositivos
+
+        Returns:
+            Lista de (device_id, operação, parâmetros)
+        """
+        targets = []
+        for device_id, device in devices.items():
+            for cmd in device.get("commands", []):
+                if cmd.get("kind", "control") != "read":
+                    continue
+                if cmd["command"].get("parameters"):
+                    parameter_sets = cmd.get("poll_parameters", [])
+                else:
+                    parameter_sets = [{}]
+                for parameters in parameter_sets:
+                    targets.append((device_id, cmd["operation"], dict(parameters)))
+        return targets
+
     @staticmethod
     def _load_mock_devices() -> Dict:
         """
@@ -163,9 +943,11 @@ class DeviceCommandService:
             "sensor-soil-001": {
                 "url": "telnet://192.168.1.100:23",
                 "description": "Sensor de umidade e temperatura do solo",
+                "rate_limit": {"rate_per_second": 2.0, "burst": 2},
                 "commands": [
                     {
                         "operation": "READ_HUMIDITY",
+                        "kind": "read",
                         "command": {
                             "command": "READ",
                             "parameters": [
@@ -175,6 +957,7 @@ class DeviceCommandService:
                     },
                     {
                         "operation": "SET_THRESHOLD",
+                        "kind": "control",
                         "command": {
                             "command": "CONFIGURE",
                             "parameters": [
@@ -188,9 +971,11 @@ class DeviceCommandService:
             "sensor-weather-001": {
                 "url": "telnet://192.168.1.101:23",
                 "description": "Estação meteorológica",
+                "rate_limit": {"rate_per_second": 5.0, "burst": 5},
                 "commands": [
                     {
                         "operation": "READ_TEMPERATURE",
+                        "kind": "read",
                         "command": {
                             "command": "READ_TEMP",
                             "parameters": []
@@ -198,6 +983,7 @@ class DeviceCommandService:
                     },
                     {
                         "operation": "READ_HUMIDITY",
+                        "kind": "read",
                         "command": {
                             "command": "READ_HUM",
                             "parameters": []
@@ -205,6 +991,7 @@ class DeviceCommandService:
                     },
                     {
                         "operation": "READ_RAINFALL",
+                        "kind": "read",
                         "command": {
                             "command": "READ_RAIN",
                             "parameters": [
@@ -217,9 +1004,11 @@ class DeviceCommandService:
             "irrigation-system-001": {
                 "url": "telnet://192.168.1.102:23",
                 "description": "Sistema de irrigação",
+                "rate_limit": {"rate_per_second": 1.0, "burst": 1},
                 "commands": [
                     {
                         "operation": "START_IRRIGATION",
+                        "kind": "control",
                         "command": {
                             "command": "START",
                             "parameters": [
@@ -230,6 +1019,7 @@ class DeviceCommandService:
                     },
                     {
                         "operation": "STOP_IRRIGATION",
+                        "kind": "control",
                         "command": {
                             "command": "STOP",
                             "parameters": [
@@ -239,6 +1029,8 @@ class DeviceCommandService:
                     },
                     {
                         "operation": "GET_ZONE_STATUS",
+                        "kind": "read",
+                        "poll_parameters": [{"zone": "1"}, {"zone": "2"}],
                         "command": {
                             "command": "STATUS",
                             "parameters": [
@@ -247,5 +1039,31 @@ class DeviceCommandService:
                         }
                     }
                 ]
+            },
+            "datalogger-001": {
+                "url": "telnet://192.168.1.103:23",
+                "description": "Registrador de dados",
+                "rate_limit": {"rate_per_second": 1.0, "burst": 1},
+                "commands": [
+                    {
+                        "operation": "READ_TEMPERATURE",
+                        "kind": "read",
+                        "command": {
+                            "command": "READ_TEMP",
+                            "parameters": []
+                        }
+                    },
+                    {
+                        "operation": "EXPORT_LOG",
+                        "kind": "stream",
+                        "stream": {"end_marker": "END\r", "idle_timeout_s": 5.0, "chunk_size": 8192},
+                        "command": {
+                            "command": "DUMP_LOG",
+                            "parameters": [
+                                {"name": "lines", "description": "Número de registros"}
+                            ]
+                        }
+                    }
+                ]
             }
         }
@@ -0,0 +1,53 @@
+"""Estatísticas de latência e saúde por dispositivo"""
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional
+
+# Peso da amostra mais recente na média móvel exponencial de latência
+_LATENCY_SMOOTHING = 0.2
+
+
+@dataclass
+class DeviceHealth:
+    """Latência e resultado das chamadas recentes a um dispositivo"""
+    latency_ewma_ms: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_success_at: Optional[float] = None
+    last_failure_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def record(self, success: bool, latency_ms: float, error: Optional[str] = None) -> None:
+        """
+        Registra o resultado de uma chamada ao dispositivo
+
+        Args:
+            success: Se a chamada teve sucesso
+            latency_ms: Latência da chamada em milissegundos
+            error: Mensagem de erro (em caso de falha)
+        """
+        now = time.time()
+        if success:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.last_success_at = now
+            if self.latency_ewma_ms is None:
+                self.latency_ewma_ms = latency_ms
+            else:
+                self.latency_ewma_ms += _LATENCY_SMOOTHING * (latency_ms - self.latency_ewma_ms)
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure_at = now
+            self.last_error = error
+
+    def to_dict(self) -> Dict:
+        """Serializa as estatísticas"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DeviceHealth":
+        """Restaura as estatísticas serializadas, ignorando campos desconhecidos"""
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
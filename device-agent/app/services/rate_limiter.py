@@ -0,0 +1,82 @@
+"""Limitação de taxa de comandos por dispositivo (token bucket)"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket assíncrono: até `burst` comandos imediatos, reabastecido a `rate` por segundo"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Inicializa o bucket cheio
+
+        Args:
+            rate: Tokens repostos por segundo
+            burst: Capacidade máxima do bucket
+        """
+        if rate <= 0:
+            raise ValueError("rate deve ser maior que zero")
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        # Serializa as esperas para atender os comandos na ordem de chegada
+        self._waiters = asyncio.Lock()
+
+    @property
+    def refill_interval(self) -> float:
+        """Tempo para repor um token, em segundos"""
+        return 1.0 / self.rate
+
+    def try_acquire(self) -> bool:
+        """
+        Consome um token se houver disponível, sem esperar
+
+        Returns:
+            True se o token foi consumido
+        """
+        self._refill()
+        if self._tokens >= 1.0 and not self._waiters.locked():
+            self._tokens -= 1.0
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        """Aguarda até um token ficar disponível e o consome"""
+        async with self._waiters:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    def _refill(self) -> None:
+        """Repõe os tokens proporcionalmente ao tempo decorrido"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+def build_rate_limiters(devices: Dict) -> Dict[str, TokenBucket]:
+    """
+    Cria um token bucket para cada dispositivo com "rate_limit" no registro
+
+    Formato no registro: "rate_limit": {"rate_per_second": 2.0, "burst": 2}
+
+    Args:
+        devices: Dicionário de dispositivos
+
+    Returns:
+        Dicionário device_id -> TokenBucket
+    """
+    limiters = {}
+    for device_id, device in devices.items():
+        config: Optional[Dict] = device.get("rate_limit")
+        if config:
+            limiters[device_id] = TokenBucket(
+                rate=float(config["rate_per_second"]),
+                burst=int(config.get("burst", 1))
+            )
+    return limiters
@@ -0,0 +1,125 @@
+"""Snapshot local do estado em memória do agente para reinícios rápidos"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando o formato do snapshot mudar de forma incompatível
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+class StateSnapshotFile:
+    """
+    Grava e lê o snapshot do estado do agente (JSON comprimido com gzip)
+
+    A gravação é atômica (arquivo temporário + os.replace), então uma queda no
+    meio da gravação mantém o snapshot anterior intacto. Gravações simultâneas
+    (ex: uma gravação periódica cancelada cuja thread ainda roda e a gravação
+    final do encerramento) são serializadas e usam arquivos temporários distintos.
+    """
+
+    def __init__(self, path: str, max_age_s: float = 3600.0):
+        """
+        Inicializa o arquivo de snapshot
+
+        Args:
+            path: Caminho do arquivo
+            max_age_s: Idade máxima para um snapshot ser aceito na leitura
+        """
+        self.path = path
+        self.max_age_s = max_age_s
+        self._save_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["StateSnapshotFile"]:
+        """
+        Cria o arquivo a partir das variáveis de ambiente STATE_SNAPSHOT_*
+
+        Returns:
+            Arquivo configurado ou None se STATE_SNAPSHOT_PATH não estiver definida
+        """
+        path = os.getenv("STATE_SNAPSHOT_PATH")
+        if not path:
+            return None
+        return cls(path, max_age_s=float(os.getenv("STATE_SNAPSHOT_MAX_AGE_S", "3600")))
+
+    def save(self, state: Dict, registry_fingerprint: str) -> int:
+        """
+        Grava o snapshot
+
+        Args:
+            state: Estado serializável em JSON
+            registry_fingerprint: Impressão digital do registro de dispositivos
+
+        Returns:
+            Tamanho do arquivo gravado em bytes
+        """
+        document = {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "created_at": time.time(),
+            "registry_fingerprint": registry_fingerprint,
+            "state": state,
+        }
+        body = gzip.compress(
+            json.dumps(document, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        )
+
+        directory, name = os.path.split(os.path.abspath(self.path))
+        with self._save_lock:
+            descriptor, temporary_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(descriptor, "wb") as snapshot:
+                    snapshot.write(body)
+                os.replace(temporary_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(temporary_path)
+                except OSError:
+                    pass
+                raise
+        return len(body)
+
+    def load(self, registry_fingerprint: str) -> Optional[Dict]:
+        """
+        Lê e valida o snapshot
+
+        Args:
+            registry_fingerprint: Impressão digital do registro atual
+
+        Returns:
+            Dicionário com "state" e "registry_matches", ou None se não houver
+            snapshot válido
+        """
+        try:
+            with open(self.path, "rb") as snapshot:
+                document = json.loads(gzip.decompress(snapshot.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"Snapshot {self.path} ilegível, ignorado: {e}")
+            return None
+
+        if not isinstance(document, dict) or document.get("format") != SNAPSHOT_FORMAT_VERSION:
+            logger.warning(f"Snapshot {self.path} em formato incompatível, ignorado")
+            return None
+
+        age = time.time() - float(document.get("created_at", 0))
+        if age > self.max_age_s or age < 0:
+            logger.warning(f"Snapshot {self.path} com idade {age:.0f}s fora do limite, ignorado")
+            return None
+
+        state = document.get("state")
+        if not isinstance(state, dict):
+            logger.warning(f"Snapshot {self.path} sem estado, ignorado")
+            return None
+
+        return {
+            "state": state,
+            "registry_matches": document.get("registry_fingerprint") == registry_fingerprint,
+        }
@@ -0,0 +1,246 @@
+"""Envio em lote de resultados de comandos para o backend"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryPushPipeline:
+    """
+    Acumula resultados em uma fila limitada e os envia ao backend em lotes
+
+    Um lote é enviado quando atinge batch_size registros ou quando passa
+    flush_interval_s desde o primeiro registro pendente. Todos os envios usam o
+    mesmo httpx.AsyncClient (conexão keep-alive) com corpo JSON comprimido em
+    gzip. Se o backend estiver lento ou fora do ar, ou se a fila encher, os
+    lotes são gravados em disco e reenviados quando o backend voltar.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        batch_size: int = 100,
+        flush_interval_s: float = 2.0,
+        queue_size: int = 10000,
+        spill_dir: str = "telemetry_spill",
+        max_spill_files: int = 1000,
+        timeout: float = 5.0
+    ):
+        """
+        Inicializa o pipeline (o envio começa em start())
+
+        Args:
+            endpoint: URL do backend que recebe os lotes (POST)
+            batch_size: Número máximo de registros por lote
+            flush_interval_s: Tempo máximo de espera para completar um lote
+            queue_size: Capacidade da fila em memória
+            spill_dir: Diretório dos lotes gravados em disco
+            max_spill_files: Número máximo de lotes em disco (os mais antigos são descartados)
+            timeout: Tempo máximo de cada envio (segundos)
+        """
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.spill_dir = Path(spill_dir)
+        self.max_spill_files = max_spill_files
+        self.timeout = timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._overflow: List[Dict] = []
+        self._spill_tasks: Set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["TelemetryPushPipeline"]:
+        """
+        Cria o pipeline a partir das variáveis de ambiente TELEMETRY_PUSH_*
+
+        Returns:
+            Pipeline configurado ou None se TELEMETRY_PUSH_URL não estiver definida
+        """
+        endpoint = os.getenv("TELEMETRY_PUSH_URL")
+        if not endpoint:
+            return None
+
+        return cls(
+            endpoint,
+            batch_size=int(os.getenv("TELEMETRY_PUSH_BATCH_SIZE", "100")),
+            flush_interval_s=float(os.getenv("TELEMETRY_PUSH_INTERVAL_S", "2.0")),
+            queue_size=int(os.getenv("TELEMETRY_PUSH_QUEUE_SIZE", "10000")),
+            spill_dir=os.getenv("TELEMETRY_SPILL_DIR", "telemetry_spill"),
+            max_spill_files=int(os.getenv("TELEMETRY_SPILL_MAX_FILES", "1000")),
+            timeout=float(os.getenv("TELEMETRY_PUSH_TIMEOUT_S", "5.0"))
+        )
+
+    def submit(self, record: Dict) -> None:
+        """
+        Enfileira um registro para envio (não bloqueia)
+
+        Args:
+            record: Registro serializável em JSON
+        """
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # Backend lento: o excedente vai para disco em lotes, fora do laço de eventos
+            self._overflow.append(record)
+            if len(self._overflow) >= self.batch_size:
+                batch, self._overflow = self._overflow, []
+                task = asyncio.get_running_loop().create_task(
+                    asyncio.to_thread(self._spill_batch, batch)
+                )
+                self._spill_tasks.add(task)
+                task.add_done_callback(self._spill_tasks.discard)
+
+    async def start(self) -> None:
+        """Abre o cliente HTTP compartilhado e inicia o envio em segundo plano"""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=2, max_keepalive_connections=2, keepalive_expiry=60.0),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        )
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Envio de telemetria para {self.endpoint} "
+            f"(lote={self.batch_size}, intervalo={self.flush_interval_s}s)"
+        )
+
+    async def stop(self) -> None:
+        """Envia o que estiver pendente e fecha o cliente HTTP"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Último envio; após a primeira falha o restante vai direto para disco, sem
+        # esperar o timeout de cada lote, e é reenviado na próxima execução
+        sent = True
+        while not self._queue.empty():
+            batch = self._take_batch([])
+            if sent:
+                sent = await self._send(batch)
+            else:
+                await asyncio.to_thread(self._spill_batch, batch)
+        if sent:
+            await self._resend_spilled()
+        if self._spill_tasks:
+            await asyncio.gather(*self._spill_tasks, return_exceptions=True)
+        if self._overflow:
+            await asyncio.to_thread(self._spill_batch, self._overflow)
+            self._overflow = []
+
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        """Laço de envio: monta lotes por tamanho ou tempo e reenvia lotes em disco"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval_s
+
+            try:
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Encerramento enquanto o lote era montado: preserva o lote em disco
+                await asyncio.to_thread(self._spill_batch, batch)
+                raise
+
+            # A partir daqui o lote é de _send, que o grava em disco se for cancelado
+            if await self._send(self._take_batch(batch)):
+                await self._resend_spilled()
+
+    def _take_batch(self, batch: List[Dict]) -> List[Dict]:
+        """Completa o lote com o que já estiver na fila, sem esperar"""
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _send(self, batch: List[Dict]) -> bool:
+        """
+        Envia um lote ao backend; em caso de falha ou cancelamento, grava em disco
+
+        Args:
+            batch: Registros do lote
+
+        Returns:
+            True se o backend aceitou o lote
+        """
+        if not batch:
+            return True
+
+        body = self._encode(batch)
+        try:
+            posted = await self._post(body)
+        except asyncio.CancelledError:
+            # Encerramento durante o envio: o lote vai para disco (pode ser reenviado em duplicidade)
+            await asyncio.to_thread(self._spill, body)
+            raise
+
+        if posted:
+            logger.debug(f"Lote de telemetria enviado: {len(batch)} registros, {len(body)} bytes")
+            return True
+
+        # Se o cancelamento chegar durante a gravação, a thread termina o arquivo sozinha
+        await asyncio.to_thread(self._spill, body)
+        return False
+
+    async def _post(self, body: bytes) -> bool:
+        """Envia um corpo já comprimido ao backend"""
+        try:
+            response = await self._client.post(self.endpoint, content=body)
+            response.raise_for_status()
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Falha ao enviar telemetria para {self.endpoint}: {e}")
+            return False
+
+    async def _resend_spilled(self) -> None:
+        """Reenvia os lotes gravados em disco, do mais antigo ao mais novo"""
+        for path in sorted(self.spill_dir.glob("batch-*.json.gz")):
+            body = await asyncio.to_thread(path.read_bytes)
+            if not await self._post(body):
+                return
+            path.unlink(missing_ok=True)
+            logger.info(f"Lote de telemetria em disco reenviado: {path.name}")
+
+    def _spill_batch(self, batch: List[Dict]) -> None:
+        """Serializa e grava um lote em disco (executado em uma thread)"""
+        self._spill(self._encode(batch))
+
+    def _spill(self, body: bytes) -> None:
+        """Grava um lote comprimido em disco, respeitando o limite de arquivos"""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        spilled = sorted(self.spill_dir.glob("batch-*.json.gz"))
+        for path in spilled[:max(len(spilled) - self.max_spill_files + 1, 0)]:
+            logger.warning(f"Limite de lotes em disco atingido; descartando {path.name}")
+            path.unlink(missing_ok=True)
+
+        path = self.spill_dir / f"batch-{time.time_ns()}.json.gz"
+        path.write_bytes(body)
+        logger.warning(f"Lote de telemetria gravado em disco: {path.name}")
+
+    @staticmethod
+    def _encode(batch: List[Dict]) -> bytes:
+        """Serializa o lote em JSON comprimido com gzip"""
+        payload = json.dumps({"readings": batch}, separators=(",", ":"), ensure_ascii=False)
+        return gzip.compress(payload.encode("utf-8"), compresslevel=6)
@@ -0,0 +1,180 @@
+"""Memória dos últimos valores lidos de cada dispositivo"""
+import hashlib
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class TelemetryEntry:
+    """Último valor lido de uma operação de um dispositivo"""
+    device_id: str
+    operation: str
+    parameters: Tuple[str, ...]
+    data: str
+    value: Optional[float]
+    sampled_at: float        # Instante da leitura (epoch, segundos)
+    version: int             # Muda apenas quando o valor muda
+    restored: bool = False   # Carregada do snapshot de uma execução anterior
+
+    @property
+    def etag(self) -> str:
+        """ETag calculado a partir do valor interpretado e do instante da leitura"""
+        value = self.data if self.value is None else repr(self.value)
+        digest = hashlib.sha1(f"{value}|{self.sampled_at:.6f}".encode("utf-8")).hexdigest()
+        return f'"{digest[:20]}"'
+
+    def age(self) -> float:
+        """Idade da leitura em segundos"""
+        return time.time() - self.sampled_at
+
+
+# Chave de uma leitura: (dispositivo, operação, parâmetros na ordem do comando)
+ReadingKey = Tuple[str, str, Tuple[str, ...]]
+
+
+class TelemetryStore:
+    """Guarda o último valor por (dispositivo, operação, parâmetros) com um número de versão"""
+
+    def __init__(self):
+        """Inicializa a memória vazia"""
+        self._entries: Dict[ReadingKey, TelemetryEntry] = {}
+        # Versões derivadas do relógio em milissegundos: continuam crescendo após
+        # um reinício, então vetores de versão antigos dos clientes seguem válidos
+        self._versions = itertools.count(int(time.time() * 1000))
+
+    def update(
+        self,
+        device_id: str,
+        operation: str,
+        parameters: Tuple[str, ...],
+        data: str,
+        value: Optional[float],
+        sampled_at: Optional[float] = None
+    ) -> TelemetryEntry:
+        """
+        Registra uma leitura
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+            parameters: Parâmetros usados na leitura
+            data: Resposta do dispositivo
+            value: Valor numérico interpretado (se houver)
+            sampled_at: Instante da leitura (padrão: agora)
+
+        Returns:
+            Entrada atualizada
+        """
+        key = (device_id, operation, parameters)
+        previous = self._entries.get(key)
+        unchanged = previous is not None and previous.data == data
+
+        entry = TelemetryEntry(
+            device_id=device_id,
+            operation=operation,
+            parameters=parameters,
+            data=data,
+            value=value,
+            sampled_at=time.time() if sampled_at is None else sampled_at,
+            version=previous.version if unchanged else next(self._versions)
+        )
+        self._entries[key] = entry
+        return entry
+
+    def get(
+        self,
+        device_id: str,
+        operation: str,
+        parameters: Tuple[str, ...]
+    ) -> Optional[TelemetryEntry]:
+        """
+        Retorna a última leitura de uma operação com os parâmetros indicados
+
+        Args:
+            device_id: Identificador do dispositivo
+            operation: Nome da operação
+            parameters: Parâmetros da leitura, na ordem do comando
+
+        Returns:
+            Entrada ou None se nunca foi lida
+        """
+        return self._entries.get((device_id, operation, parameters))
+
+    def export(self) -> List[Dict]:
+        """
+        Serializa as leituras guardadas
+
+        Returns:
+            Lista de leituras serializáveis em JSON
+        """
+        return [
+            {
+                "device_id": entry.device_id,
+                "operation": entry.operation,
+                "parameters": list(entry.parameters),
+                "data": entry.data,
+                "value": entry.value,
+                "sampled_at": entry.sampled_at,
+                "version": entry.version,
+            }
+            for entry in self._entries.values()
+        ]
+
+    def restore(self, readings: List[Dict]) -> int:
+        """
+        Restaura leituras serializadas sem sobrescrever leituras mais novas
+
+        Args:
+            readings: Leituras no formato de export()
+
+        Returns:
+            Número de leituras restauradas
+        """
+        restored = 0
+        for reading in readings:
+            key = (reading["device_id"], reading["operation"], tuple(reading["parameters"]))
+            current = self._entries.get(key)
+            if current is not None and current.sampled_at >= reading["sampled_at"]:
+                continue
+
+            self._entries[key] = TelemetryEntry(
+                device_id=reading["device_id"],
+                operation=reading["operation"],
+                parameters=key[2],
+                data=reading["data"],
+                value=reading["value"],
+                sampled_at=reading["sampled_at"],
+                version=reading["version"],
+                restored=True
+            )
+            restored += 1
+
+        # Novas versões continuam acima das restauradas
+        highest = max((entry.version for entry in self._entries.values()), default=0)
+        next_version = next(self._versions)
+        self._versions = itertools.count(max(next_version, highest + 1))
+        return restored
+
+    def changed_since(
+        self,
+        versions: Dict[ReadingKey, int],
+        device_ids: Optional[List[str]] = None
+    ) -> List[TelemetryEntry]:
+        """
+        Lista as leituras cuja versão é mais nova que a conhecida pelo cliente
+
+        Args:
+            versions: Vetor de versões do cliente: (device_id, operação, parâmetros) -> versão
+            device_ids: Restringe a busca a estes dispositivos (opcional)
+
+        Returns:
+            Entradas alteradas (pares ausentes do vetor contam como versão 0)
+        """
+        allowed = set(device_ids) if device_ids is not None else None
+        return [
+            entry for key, entry in self._entries.items()
+            if (allowed is None or entry.device_id in allowed)
+            and entry.version > versions.get(key, 0)
+        ]
@@ -3,8 +3,12 @@ import asyncio
 import logging
 import os
 import random
-from typing import Tuple, Optional
+import socket
+import time
+from typing import AsyncIterator, Dict, List, Tuple, Optional, Union
 from urllib.parse import urlparse
+from app.services.telnet_iac import TelnetIacFilter
+from app.services.traffic_recorder import TrafficRecorder, TrafficReplayer
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,29 @@ class TelnetDeviceClient:
         if self.mock_mode:
             logger.info("Modo MOCK ativado - dispositivos serão simulados")
 
+        # Cache de resolução de nomes: hostname -> {"addresses": [IPs], "expires_at": epoch}
+        self.resolved_addresses: Dict[str, Dict] = {}
+        self.dns_ttl_s = float(os.getenv("DEVICE_DNS_TTL_S", "300"))
+
+        # Gravação/reprodução de tráfego: DEVICE_TRAFFIC_MODE=off|record|replay
+        self.recorder: Optional[TrafficRecorder] = None
+        self.replayer: Optional[TrafficReplayer] = None
+        traffic_mode = os.getenv("DEVICE_TRAFFIC_MODE", "off").lower()
+        traffic_file = os.getenv("DEVICE_TRAFFIC_FILE", "device_traffic.jsonl")
+        if traffic_mode == "record":
+            self.recorder = TrafficRecorder(traffic_file)
+        elif traffic_mode == "replay":
+            self.replayer = TrafficReplayer(
+                traffic_file,
+                latency_scale=float(os.getenv("DEVICE_REPLAY_LATENCY_SCALE", "1.0"))
+            )
+
+    def close(self) -> None:
+        """Libera recursos do cliente (fecha o arquivo de gravação, se houver)"""
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
     async def execute_command(
         self,
         device_url: str,
@@ -41,22 +68,56 @@ class TelnetDeviceClient:
         Returns:
             Tupla (sucesso, resposta)
         """
+        # Monta a string de comando: cmd param1 param2\r
+        command_string = self._format_command(command, parameters)
+
+        # Em modo replay, serve a troca gravada sem tocar o dispositivo
+        if self.replayer:
+            return await self._execute_replayed_command(device_url, command_string)
+
+        start_time = time.monotonic()
+
         # Se estiver em modo mock, retorna dados simulados
         if self.mock_mode:
-            return self._execute_mock_command(command, parameters)
-        
+            success, response = self._execute_mock_command(command, parameters)
+        else:
+            success, response = await self._execute_device_command(device_url, command_string)
+
+        if self.recorder:
+            self.recorder.record(
+                device_url,
+                command_string,
+                success,
+                response,
+                time.monotonic() - start_time
+            )
+
+        return success, response
+
+    async def _execute_device_command(
+        self,
+        device_url: str,
+        command_string: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Envia o comando ao dispositivo via Telnet/TCP e aguarda a resposta
+
+        Args:
+            device_url: URL do dispositivo (ex: telnet://192.168.1.100:23)
+            command_string: Comando formatado com terminador
+
+        Returns:
+            Tupla (sucesso, resposta)
+        """
         try:
             # Extrai host e porta da URL
             host, port = self._parse_device_url(device_url)
 
-            # Monta a string de comando: cmd param1 param2\r
-            command_string = self._format_command(command, parameters)
-
             logger.info(f"Conectando a {host}:{port}")
 
             # Abre conexão TCP assíncrona
             reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(host, port),
+                self._open_connection(host, port),
                 timeout=self.timeout
             )
 
@@ -69,7 +130,7 @@ class TelnetDeviceClient:
 
                 # Aguarda a resposta
                 response = await asyncio.wait_for(
-                    self._read_until_terminator(reader),
+                    self._read_until_terminator(reader, writer),
                     timeout=self.timeout
                 )
 
@@ -101,33 +162,338 @@ class TelnetDeviceClient:
             logger.error(error_msg, exc_info=True)
             return False, error_msg
 
-    async def _read_until_terminator(self, reader: asyncio.StreamReader, terminator: bytes = b'\r') -> str:
+    async def _execute_replayed_command(
+        self,
+        device_url: str,
+        command_string: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Reproduz uma troca gravada com a latência original (ou escalada)
+
+        Args:
+            device_url: URL do dispositivo
+            command_string: Comando formatado com terminador
+
+        Returns:
+            Tupla (sucesso, resposta) gravada
+        """
+        exchange = self.replayer.next_exchange(device_url, command_string)
+        if exchange is None:
+            error_msg = f"Nenhuma troca gravada para {repr(command_string)} em {device_url}"
+            logger.error(error_msg)
+            return False, error_msg
+
+        delay = self.replayer.delay_for(exchange)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        logger.debug(f"[REPLAY] Resposta gravada: {repr(exchange.response)}")
+        return exchange.success, exchange.response
+
+    async def open_stream(
+        self,
+        device_url: str,
+        command: str,
+        parameters: list[str],
+        end_marker: Optional[str] = None,
+        idle_timeout: float = 2.0,
+        chunk_size: int = 4096
+    ) -> Tuple[bool, Union[AsyncIterator[bytes], str]]:
+        """
+        Envia um comando de saída extensa (dump/exportação) e retorna um iterador da saída
+
+        A conexão é aberta e o comando enviado antes do retorno, para que erros de
+        conexão sejam reportados antes de iniciar a resposta HTTP. A saída é lida em
+        blocos somente quando o consumidor pede o próximo bloco, então a memória
+        usada não cresce com o tamanho do dump. Sequências Telnet (IAC) são
+        removidas e respondidas.
+
+        Args:
+            device_url: URL do dispositivo (ex: telnet://192.168.1.100:23)
+            command: Comando a executar
+            parameters: Lista de parâmetros
+            end_marker: Marcador de fim de saída (não é repassado ao cliente)
+            idle_timeout: Encerra a saída após este tempo sem dados (segundos)
+            chunk_size: Tamanho máximo de cada bloco lido
+
+        Returns:
+            Tupla (True, iterador de blocos) ou (False, mensagem de erro)
+        """
+        # Saídas em fluxo não são gravadas: em modo replay não há o que reproduzir
+        # e o dispositivo real não deve ser acessado
+        if self.replayer:
+            error_msg = f"Saída em fluxo indisponível em modo replay ({repr(command)} em {device_url})"
+            logger.error(error_msg)
+            return False, error_msg
+
+        marker = end_marker.encode('utf-8') if end_marker else None
+
+        if self.mock_mode:
+            return True, self._mock_stream_output(command, parameters, marker)
+
+        command_string = self._format_command(command, parameters)
+        writer = None
+
+        try:
+            host, port = self._parse_device_url(device_url)
+            logger.info(f"Conectando a {host}:{port} para saída em fluxo")
+
+            reader, writer = await asyncio.wait_for(
+                self._open_connection(host, port),
+                timeout=self.timeout
+            )
+            writer.write(command_string.encode('utf-8'))
+            await asyncio.wait_for(writer.drain(), timeout=self.timeout)
+
+        except asyncio.TimeoutError:
+            error_msg = f"Timeout ao comunicar com dispositivo {device_url}"
+
+        except OSError as e:
+            error_msg = f"Erro de comunicação com dispositivo {device_url}: {str(e)}"
+
+        except asyncio.CancelledError:
+            if writer is not None:
+                writer.close()
+            raise
+
+        else:
+            return True, self._stream_output(reader, writer, marker, idle_timeout, chunk_size)
+
+        # Falha depois de conectar (envio do comando): a conexão não é repassada, então fecha aqui
+        logger.error(error_msg)
+        if writer is not None:
+            writer.close()
+        return False, error_msg
+
+    async def _stream_output(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        marker: Optional[bytes],
+        idle_timeout: float,
+        chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Repassa a saída do dispositivo em blocos até o marcador de fim, EOF ou ociosidade
+
+        Os últimos len(marker) - 1 bytes de cada bloco ficam retidos até o próximo,
+        para detectar marcadores divididos entre dois blocos. Um erro de conexão no
+        meio da saída (ex: conexão reiniciada pelo dispositivo) encerra o fluxo com
+        o que já foi recebido; a resposta HTTP já começou, então ele só é registrado no log.
+
+        Args:
+            reader: StreamReader da conexão
+            writer: StreamWriter da conexão (fechado ao final)
+            marker: Marcador de fim de saída
+            idle_timeout: Tempo máximo sem dados (segundos)
+            chunk_size: Tamanho máximo de cada bloco lido
+
+        Yields:
+            Blocos da saída do dispositivo
+        """
+        hold = len(marker) - 1 if marker else 0
+        pending = b''
+        total = 0
+        iac_filter = TelnetIacFilter()
+
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(reader.read(chunk_size), timeout=idle_timeout)
+                    if not chunk:
+                        break
+
+                    chunk, replies = iac_filter.feed(chunk)
+                    if replies:
+                        writer.write(replies)
+                        await writer.drain()
+                except asyncio.TimeoutError:
+                    if marker:
+                        logger.warning("Saída em fluxo encerrada por ociosidade antes do marcador de fim")
+                    break
+                except OSError as e:
+                    logger.error(f"Saída em fluxo interrompida por erro de conexão após {total} bytes: {e}")
+                    break
+
+                if not chunk:
+                    continue
+
+                buffer = pending + chunk if pending else chunk
+                if marker:
+                    end = buffer.find(marker)
+                    if end >= 0:
+                        if end:
+                            total += end
+                            yield buffer[:end]
+                        pending = b''
+                        break
+
+                if hold and len(buffer) > hold:
+                    pending = buffer[-hold:]
+                    buffer = buffer[:-hold]
+                elif hold:
+                    pending = buffer
+                    continue
+
+                total += len(buffer)
+                yield buffer
+
+            if pending:
+                total += len(pending)
+                yield pending
+
+            logger.info(f"Saída em fluxo concluída: {total} bytes")
+
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _open_connection(
+        self,
+        host: str,
+        port: int
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Abre a conexão TCP usando os endereços resolvidos em cache
+
+        Todos os endereços do host (IPv4 e IPv6) ficam em cache por DEVICE_DNS_TTL_S
+        e são tentados em ordem. Um endereço interrompido pelo timeout vai para o
+        fim da lista; se todos falharem, o host é removido do cache para ser
+        resolvido novamente na próxima tentativa.
+
+        Args:
+            host: Hostname ou IP do dispositivo
+            port: Porta TCP
+
+        Returns:
+            Tupla (reader, writer)
+        """
+        addresses = await self._resolve(host, port)
+        last_error: Optional[OSError] = None
+        for address in addresses:
+            try:
+                return await asyncio.open_connection(address, port)
+            except OSError as e:
+                logger.debug(f"Falha ao conectar em {address}:{port} ({host}): {e}")
+                last_error = e
+            except asyncio.CancelledError:
+                cached = self.resolved_addresses.get(host)
+                if cached is not None and address in cached["addresses"]:
+                    cached["addresses"].remove(address)
+                    cached["addresses"].append(address)
+                raise
+
+        self.resolved_addresses.pop(host, None)
+        raise last_error
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        """
+        Retorna os endereços do host, resolvendo quando o cache expirou
+
+        Args:
+            host: Hostname ou IP do dispositivo
+            port: Porta TCP
+
+        Returns:
+            Lista de endereços IP, sem repetições, na ordem do resolvedor
+        """
+        cached = self.resolved_addresses.get(host)
+        if cached is not None and cached["expires_at"] > time.time():
+            return list(cached["addresses"])
+
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self.resolved_addresses[host] = {
+            "addresses": addresses,
+            "expires_at": time.time() + self.dns_ttl_s,
+        }
+        return list(addresses)
+
+    def export_addresses(self) -> Dict[str, Dict]:
+        """
+        Serializa o cache de resolução de nomes
+
+        Returns:
+            Dicionário hostname -> {"addresses": [...], "expires_at": epoch}
+        """
+        return {
+            host: {"addresses": list(cached["addresses"]), "expires_at": cached["expires_at"]}
+            for host, cached in self.resolved_addresses.items()
+        }
+
+    def restore_addresses(self, entries: Dict[str, Dict]) -> int:
+        """
+        Restaura o cache de resolução de nomes, descartando entradas expiradas
+
+        Args:
+            entries: Cache no formato de export_addresses()
+
+        Returns:
+            Número de hosts restaurados
+        """
+        now = time.time()
+        restored = 0
+        for host, cached in entries.items():
+            if host in self.resolved_addresses or float(cached["expires_at"]) <= now:
+                continue
+            addresses = [str(address) for address in cached["addresses"]]
+            if addresses:
+                self.resolved_addresses[host] = {
+                    "addresses": addresses,
+                    "expires_at": float(cached["expires_at"]),
+                }
+                restored += 1
+        return restored
+
+    async def _read_until_terminator(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        terminator: bytes = b'\r',
+        chunk_size: int = 4096
+    ) -> str:
         """
         Lê dados do stream até encontrar o terminador
 
+        As sequências de negociação Telnet (IAC) são removidas dos dados e
+        respondidas automaticamente pelo writer.
+
         Args:
             reader: StreamReader assíncrono
+            writer: StreamWriter da conexão (respostas às negociações)
             terminator: Bytes terminadores (padrão: \r)
+            chunk_size: Tamanho máximo de cada leitura
 
         Returns:
             Dados lidos como string
         """
-        data = b''
+        iac_filter = TelnetIacFilter()
+        data = bytearray()
         while True:
             try:
                 chunk = await asyncio.wait_for(
-                    reader.read(1),
+                    reader.read(chunk_size),
                     timeout=self.timeout
                 )
 
                 if not chunk:
                     break
 
-                data += chunk
+                searched = max(len(data) - len(terminator) + 1, 0)
+                clean, replies = iac_filter.feed(chunk)
+                if replies:
+                    writer.write(replies)
+                    await writer.drain()
+
+                data += clean
 
-                if data.endswith(terminator):
-                    # Remove o terminador antes de retornar
-                    return data[:-len(terminator)].decode('utf-8', errors='ignore')
+                end = data.find(terminator, searched)
+                if end >= 0:
+                    # Remove o terminador (e o que vier depois) antes de retornar
+                    return data[:end].decode('utf-8', errors='ignore')
 
             except asyncio.TimeoutError:
                 if data:
@@ -177,6 +543,36 @@ class TelnetDeviceClient:
         # Adiciona terminador \r
         return command_string + '\r'
 
+    @staticmethod
+    async def _mock_stream_output(
+        command: str,
+        parameters: list[str],
+        marker: Optional[bytes]
+    ) -> AsyncIterator[bytes]:
+        """
+        Gera uma saída extensa simulada (registros de log), bloco a bloco
+
+        Args:
+            command: Comando a executar
+            parameters: Lista de parâmetros (o primeiro, se houver, é o número de linhas)
+            marker: Marcador de fim (não é repassado, como na saída real)
+
+        Yields:
+            Blocos da saída simulada
+        """
+        lines = int(parameters[0]) if parameters and parameters[0].isdigit() else 1000
+        logger.info(f"[MOCK] Gerando saída em fluxo simulada: {command} ({lines} linhas)")
+
+        for start in range(0, lines, 100):
+            block = ''.join(
+                f"LOG {index:06d} TEMP={random.randint(15, 35)}.{random.randint(0, 9)}C "
+                f"HUMIDITY={random.randint(30, 80)}%\r\n"
+                for index in range(start, min(start + 100, lines))
+            )
+            yield block.encode('utf-8')
+            # Cede o loop entre blocos, como faria a leitura real
+            await asyncio.sleep(0)
+
     def _execute_mock_command(self, command: str, parameters: list[str]) -> Tuple[bool, str]:
         """
         Executa comando em modo simulado (mock)
@@ -0,0 +1,231 @@
+"""Filtro incremental de negociação Telnet (IAC) para o transporte com dispositivos"""
+from typing import FrozenSet, Set, Tuple
+
+# Bytes de controle Telnet (RFC 854)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+# Opções (RFC 857 / RFC 858)
+OPT_ECHO = 1
+OPT_SUPPRESS_GO_AHEAD = 3
+
+# Estados da máquina
+_DATA = 0          # Dados da aplicação
+_COMMAND = 1       # Após IAC
+_OPTION = 2        # Após IAC WILL/WONT/DO/DONT, aguardando o código da opção
+_SUBNEG = 3        # Dentro de IAC SB ... (descartado)
+_SUBNEG_IAC = 4    # IAC dentro de uma subnegociação
+
+# Próximo estado para cada byte após IAC. Comandos de dois bytes (NOP, GA, ...) voltam a _DATA;
+# IAC IAC também volta a _DATA, emitindo o byte 255 literal.
+_COMMAND_TRANSITIONS = [_DATA] * 256
+for _verb in (WILL, WONT, DO, DONT):
+    _COMMAND_TRANSITIONS[_verb] = _OPTION
+_COMMAND_TRANSITIONS[SB] = _SUBNEG
+
+_LITERAL_IAC = bytes([IAC])
+_IAC_SE = bytes([IAC, SE])
+
+# Respostas pré-montadas: _REPLIES[verbo][opção] -> IAC verbo opção
+_REPLIES = {verb: [bytes((IAC, verb, option)) for option in range(256)] for verb in (WILL, WONT, DO, DONT)}
+
+# Blocos pequenos com negociação densa (pelo menos um IAC a cada _DENSE_SPACING bytes),
+# como a negociação inicial de uma conexão curta, são mais rápidos byte a byte que com find
+_SMALL_BLOCK = 256
+_DENSE_SPACING = 16
+
+
+class TelnetIacFilter:
+    """
+    Remove sequências de controle Telnet do fluxo e responde às negociações
+
+    O filtro é incremental: sequências divididas entre dois blocos são tratadas
+    corretamente. Os trechos de dados entre sequências são localizados com
+    bytes.find e copiados uma única vez no resultado; um bloco sem IAC é
+    devolvido sem cópia e um bloco pequeno com negociação densa é percorrido
+    byte a byte. Por padrão aceita que o dispositivo ative ECHO e
+    SUPPRESS-GO-AHEAD e recusa todas as demais opções.
+    """
+
+    def __init__(
+        self,
+        accept_will: FrozenSet[int] = frozenset({OPT_ECHO, OPT_SUPPRESS_GO_AHEAD}),
+        accept_do: FrozenSet[int] = frozenset()
+    ):
+        """
+        Inicializa o filtro
+
+        Args:
+            accept_will: Opções que o dispositivo pode ativar do lado dele (respondemos DO)
+            accept_do: Opções que aceitamos ativar do nosso lado (respondemos WILL)
+        """
+        self.accept_will = accept_will
+        self.accept_do = accept_do
+        self._state = _DATA
+        self._verb = 0
+        self._remote_enabled: Set[int] = set()
+        self._local_enabled: Set[int] = set()
+
+    def feed(self, data: bytes) -> Tuple[bytes, bytes]:
+        """
+        Processa um bloco recebido do dispositivo
+
+        Args:
+            data: Bytes recebidos
+
+        Returns:
+            Tupla (dados sem sequências de controle, respostas a enviar ao dispositivo)
+        """
+        state = self._state
+        if state == _DATA and data.find(IAC) < 0:
+            return data, b''
+
+        length = len(data)
+        if length <= _SMALL_BLOCK and data.count(IAC) * _DENSE_SPACING >= length:
+            return self._feed_small(data)
+
+        view = memoryview(data)
+        output = []
+        emit = output.append
+        find = data.find
+        negotiate = self._negotiate
+        transitions = _COMMAND_TRANSITIONS
+        replies = bytearray()
+        position = 0
+
+        while position < length:
+            if state == _DATA:
+                index = find(IAC, position)
+                if index < 0:
+                    emit(view[position:])
+                    break
+                if index > position:
+                    emit(view[position:index])
+                # Caminhos rápidos: sequência completa dentro do bloco
+                if index + 2 < length:
+                    next_state = transitions[data[index + 1]]
+                    if next_state == _OPTION:
+                        replies += negotiate(data[index + 1], data[index + 2])
+                        position = index + 3
+                        continue
+                    if next_state == _SUBNEG:
+                        end = find(_IAC_SE, index + 2)
+                        # IAC antes do IAC SE seria um 255 escapado: segue pela máquina de estados
+                        if end >= 0 and data[end - 1] != IAC:
+                            position = end + 2
+                            continue
+                position = index + 1
+                state = _COMMAND
+
+            elif state == _COMMAND:
+                byte = data[position]
+                position += 1
+                state = transitions[byte]
+                if byte == IAC:
+                    emit(_LITERAL_IAC)
+                elif state == _OPTION:
+                    self._verb = byte
+
+            elif state == _OPTION:
+                replies += negotiate(self._verb, data[position])
+                position += 1
+                state = _DATA
+
+            elif state == _SUBNEG:
+                index = find(IAC, position)
+                if index < 0:
+                    break
+                position = index + 1
+                state = _SUBNEG_IAC
+
+            else:  # _SUBNEG_IAC
+                byte = data[position]
+                position += 1
+                state = _DATA if byte == SE else _SUBNEG
+
+        self._state = state
+        return b''.join(output), bytes(replies)
+
+    def _feed_small(self, data: bytes) -> Tuple[bytes, bytes]:
+        """
+        Processa um bloco pequeno byte a byte (mesma máquina de estados de feed)
+
+        Args:
+            data: Bytes recebidos
+
+        Returns:
+            Tupla (dados sem sequências de controle, respostas a enviar ao dispositivo)
+        """
+        state = self._state
+        output = bytearray()
+        emit = output.append
+        transitions = _COMMAND_TRANSITIONS
+        replies = b''
+
+        for byte in data:
+            if state == _DATA:
+                if byte == IAC:
+                    state = _COMMAND
+                else:
+                    emit(byte)
+            elif state == _COMMAND:
+                state = transitions[byte]
+                if byte == IAC:
+                    emit(IAC)
+                elif state == _OPTION:
+                    self._verb = byte
+            elif state == _OPTION:
+                replies += self._negotiate(self._verb, byte)
+                state = _DATA
+            elif state == _SUBNEG:
+                if byte == IAC:
+                    state = _SUBNEG_IAC
+            else:  # _SUBNEG_IAC
+                state = _DATA if byte == SE else _SUBNEG
+
+        self._state = state
+        return bytes(output), replies
+
+    def _negotiate(self, verb: int, option: int) -> bytes:
+        """
+        Decide a resposta a uma negociação, sem responder a confirmações (evita laços)
+
+        Args:
+            verb: WILL, WONT, DO ou DONT
+            option: Código da opção
+
+        Returns:
+            Resposta a enviar (pode ser vazia)
+        """
+        if verb == WILL:
+            if option in self.accept_will:
+                if option in self._remote_enabled:
+                    return b''
+                self._remote_enabled.add(option)
+                return _REPLIES[DO][option]
+            return _REPLIES[DONT][option]
+
+        if verb == WONT:
+            if option in self._remote_enabled:
+                self._remote_enabled.discard(option)
+                return _REPLIES[DONT][option]
+            return b''
+
+        if verb == DO:
+            if option in self.accept_do:
+                if option in self._local_enabled:
+                    return b''
+                self._local_enabled.add(option)
+                return _REPLIES[WILL][option]
+            return _REPLIES[WONT][option]
+
+        # DONT
+        if option in self._local_enabled:
+            self._local_enabled.discard(option)
+            return _REPLIES[WONT][option]
+        return b''
@@ -0,0 +1,216 @@
+"""Gravação e reprodução do tráfego com dispositivos para execuções determinísticas"""
+import gzip
+import json
+import logging
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, IO, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TrafficExchange:
+    """Uma troca requisição/resposta gravada"""
+    offset_s: float          # Instante da requisição relativo ao início da gravação
+    device_url: str
+    command: str             # String de comando enviada (com terminador)
+    success: bool
+    response: Optional[str]
+    latency_s: float         # Tempo entre o envio e a resposta
+
+
+# Intervalo máximo entre flushes do arquivo comprimido (cada flush encerra um bloco gzip)
+_GZIP_FLUSH_INTERVAL_S = 1.0
+
+
+def _open_trace(path: str, mode: str) -> IO[str]:
+    """Abre o arquivo de gravação, comprimido com gzip quando termina em .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _read_trace_text(path: str) -> str:
+    """
+    Lê o conteúdo do arquivo de gravação, tolerando um final truncado
+
+    Uma gravação interrompida (queda do agente) deixa o gzip sem o marcador de
+    fim; tudo o que foi descarregado até o último flush ainda é recuperado.
+    """
+    with open(path, "rb") as trace:
+        raw = trace.read()
+
+    if not path.endswith(".gz"):
+        return raw.decode("utf-8", errors="replace")
+
+    chunks = []
+    while raw:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            chunks.append(decompressor.decompress(raw))
+        except zlib.error as e:
+            logger.warning(f"Gravação {path} corrompida, usando apenas o trecho legível: {e}")
+            break
+        if not decompressor.eof:
+            logger.warning(f"Gravação {path} truncada (gravação interrompida?), usando o trecho completo")
+            break
+        # Membros gzip concatenados
+        raw = decompressor.unused_data
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+class TrafficRecorder:
+    """Grava trocas com dispositivos em um arquivo JSON Lines compacto"""
+
+    def __init__(self, path: str):
+        """
+        Inicializa o gravador
+
+        O arquivo é truncado: cada gravação é uma sessão única, com os instantes
+        relativos ao seu próprio início.
+
+        Args:
+            path: Arquivo de gravação (.jsonl ou .jsonl.gz)
+        """
+        self.path = path
+        self._file = _open_trace(path, "w")
+        self._compressed = path.endswith(".gz")
+        self._started_at = time.monotonic()
+        self._flushed_at = self._started_at
+        logger.info(f"Gravando tráfego de dispositivos em {path} (arquivo anterior sobrescrito)")
+
+    def record(
+        self,
+        device_url: str,
+        command: str,
+        success: bool,
+        response: Optional[str],
+        latency_s: float
+    ) -> None:
+        """
+        Grava uma troca requisição/resposta
+
+        Args:
+            device_url: URL do dispositivo
+            command: String de comando enviada
+            success: Se a execução teve sucesso
+            response: Resposta ou mensagem de erro
+            latency_s: Latência observada em segundos
+        """
+        offset_s = time.monotonic() - self._started_at - latency_s
+        line = json.dumps(
+            {
+                "t": round(offset_s, 6),
+                "u": device_url,
+                "c": command,
+                "ok": success,
+                "r": response,
+                "l": round(latency_s, 6),
+            },
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        self._file.write(line + "\n")
+        # Arquivo texto: flush a cada linha para não perder a gravação em caso de queda.
+        # Com gzip, flush no máximo a cada _GZIP_FLUSH_INTERVAL_S para preservar a compressão;
+        # uma queda perde no máximo esse intervalo.
+        now = time.monotonic()
+        if not self._compressed or now - self._flushed_at >= _GZIP_FLUSH_INTERVAL_S:
+            self._file.flush()
+            self._flushed_at = now
+
+    def close(self) -> None:
+        """Fecha o arquivo de gravação"""
+        self._file.close()
+
+
+class TrafficReplayer:
+    """Reproduz trocas gravadas na ordem original, por dispositivo e comando"""
+
+    def __init__(self, path: str, latency_scale: float = 1.0):
+        """
+        Carrega uma gravação
+
+        Args:
+            path: Arquivo de gravação (.jsonl ou .jsonl.gz)
+            latency_scale: Fator aplicado às latências gravadas (1.0 = original, 0 = sem espera)
+        """
+        self.path = path
+        self.latency_scale = max(latency_scale, 0.0)
+        self.exchanges = self._load(path)
+        self._by_key: Dict[Tuple[str, str], List[TrafficExchange]] = {}
+        for exchange in self.exchanges:
+            self._by_key.setdefault((exchange.device_url, exchange.command), []).append(exchange)
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        logger.info(
+            f"Reproduzindo {len(self.exchanges)} trocas gravadas de {path} "
+            f"(escala de latência {self.latency_scale})"
+        )
+
+    def next_exchange(self, device_url: str, command: str) -> Optional[TrafficExchange]:
+        """
+        Retorna a próxima troca gravada para o dispositivo e comando
+
+        As trocas são entregues na ordem gravada e recomeçam do início quando
+        a gravação se esgota.
+
+        Args:
+            device_url: URL do dispositivo
+            command: String de comando enviada
+
+        Returns:
+            Troca gravada ou None se não houver gravação para o par
+        """
+        key = (device_url, command)
+        recorded = self._by_key.get(key)
+        if not recorded:
+            return None
+
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = (cursor + 1) % len(recorded)
+        return recorded[cursor]
+
+    def delay_for(self, exchange: TrafficExchange) -> float:
+        """
+        Calcula a espera a aplicar antes de entregar a resposta
+
+        Args:
+            exchange: Troca gravada
+
+        Returns:
+            Latência escalada em segundos
+        """
+        return exchange.latency_s * self.latency_scale
+
+    @staticmethod
+    def _load(path: str) -> List[TrafficExchange]:
+        """
+        Lê o arquivo de gravação
+
+        Args:
+            path: Arquivo de gravação
+
+        Returns:
+            Lista de trocas na ordem gravada
+        """
+        exchanges = []
+        for line in _read_trace_text(path).splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                exchanges.append(TrafficExchange(
+                    offset_s=entry["t"],
+                    device_url=entry["u"],
+                    command=entry["c"],
+                    success=entry["ok"],
+                    response=entry["r"],
+                    latency_s=entry["l"]
+                ))
+            except (ValueError, KeyError, TypeError):
+                # Última linha incompleta de uma gravação interrompida
+                logger.warning(f"Linha inválida ignorada na gravação {path}: {line[:80]!r}")
+        exchanges.sort(key=lambda exchange: exchange.offset_s)
+        return exchanges
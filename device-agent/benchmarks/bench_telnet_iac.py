@@ -0,0 +1,141 @@
+"""Benchmark do filtro de negociação Telnet (TelnetIacFilter)
+
+Uso (a partir de device-agent/):
+    python benchmarks/bench_telnet_iac.py [captura.bin ...]
+
+Sem argumentos, usa fluxos gerados com o formato observado nos dispositivos:
+um dump extenso sem negociação, muitas conexões curtas que começam com a
+negociação inicial (WILL/DO + SB TERMINAL-TYPE) seguida da resposta, e um dump
+com negociações intercaladas. Arquivos passados na linha de comando devem conter
+os bytes brutos recebidos em uma conexão (ex: gravados com
+`nc host 23 > captura.bin`). Como em TelnetDeviceClient, cada conexão usa um
+filtro novo e é entregue em blocos de 4096 bytes. O resultado é comparado com
+uma implementação de referência byte a byte, que também valida a saída. A
+referência apenas remove as sequências: não cria um filtro por conexão nem monta
+as respostas às negociações, custos que entram no tempo do filtro nas conexões curtas.
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.telnet_iac import DO, DONT, IAC, SB, SE, WILL, WONT, TelnetIacFilter  # noqa: E402
+
+CHUNK_SIZE = 4096
+TARGET_BYTES = 8 * 1024 * 1024
+
+
+def reference_filter(data: bytes) -> bytes:
+    """Remove sequências IAC processando um byte por vez (referência)"""
+    output = bytearray()
+    state = "data"
+    for byte in data:
+        if state == "data":
+            if byte == IAC:
+                state = "iac"
+            else:
+                output.append(byte)
+        elif state == "iac":
+            if byte == IAC:
+                output.append(IAC)
+                state = "data"
+            elif byte in (WILL, WONT, DO, DONT):
+                state = "option"
+            elif byte == SB:
+                state = "sb"
+            else:
+                state = "data"
+        elif state == "option":
+            state = "data"
+        elif state == "sb":
+            if byte == IAC:
+                state = "sb_iac"
+        else:
+            state = "data" if byte == SE else "sb"
+    return bytes(output)
+
+
+def generated_streams() -> dict:
+    """Gera fluxos sintéticos representativos (listas de conexões)"""
+    rng = random.Random(42)
+    negotiation = bytes([IAC, WILL, 1, IAC, WILL, 3, IAC, DO, 24, IAC, DO, 31]) + \
+        bytes([IAC, SB, 24, 1, IAC, SE])
+
+    def response() -> bytes:
+        return f"OK TEMP={rng.randint(15, 35)}.{rng.randint(0, 9)}C\r".encode()
+
+    def log_line(index: int) -> bytes:
+        return f"LOG {index:06d} TEMP={rng.randint(15, 35)}C HUMIDITY={rng.randint(30, 80)}%\r\n".encode()
+
+    plain = bytearray()
+    while len(plain) < TARGET_BYTES:
+        plain += log_line(len(plain))
+
+    connections = []
+    total = 0
+    while total < TARGET_BYTES // 8:
+        connections.append(negotiation + response())
+        total += len(connections[-1])
+
+    interleaved = bytearray()
+    index = 0
+    while len(interleaved) < TARGET_BYTES:
+        interleaved += log_line(index)
+        if index % 20 == 0:
+            interleaved += bytes([IAC, 241]) + bytes([IAC, WONT, rng.randint(0, 40)])
+        index += 1
+
+    return {
+        "dump sem negociação": [bytes(plain)],
+        "conexões curtas": connections,
+        "dump com negociação": [bytes(interleaved)],
+    }
+
+
+def run_filter(connections: list) -> tuple:
+    """Filtra cada conexão em blocos e retorna (saídas, segundos)"""
+    outputs = []
+    start = time.perf_counter()
+    for data in connections:
+        iac_filter = TelnetIacFilter()
+        output = []
+        for offset in range(0, len(data), CHUNK_SIZE):
+            clean, _ = iac_filter.feed(data[offset:offset + CHUNK_SIZE])
+            output.append(clean)
+        outputs.append(b"".join(output))
+    return outputs, time.perf_counter() - start
+
+
+def main() -> None:
+    streams = (
+        {path: [Path(path).read_bytes()] for path in sys.argv[1:]}
+        if len(sys.argv) > 1 else generated_streams()
+    )
+
+    print(
+        f"{'fluxo':<24}{'conexões':>10}{'MB':>7}{'filtro MB/s':>13}{'ref. MB/s':>11}"
+        f"{'filtro µs/con.':>16}{'ref. µs/con.':>14}"
+    )
+    for name, connections in streams.items():
+        megabytes = sum(len(data) for data in connections) / (1024 * 1024)
+        outputs, elapsed = run_filter(connections)
+
+        start = time.perf_counter()
+        expected = [reference_filter(data) for data in connections]
+        reference_elapsed = time.perf_counter() - start
+
+        if outputs != expected:
+            raise SystemExit(f"Saída divergente da referência para {name}")
+
+        count = len(connections)
+        print(
+            f"{name:<24}{count:>10}{megabytes:>7.1f}{megabytes / elapsed:>13.1f}"
+            f"{megabytes / reference_elapsed:>11.1f}"
+            f"{elapsed / count * 1e6:>16.1f}{reference_elapsed / count * 1e6:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
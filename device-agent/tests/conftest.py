@@ -0,0 +1,12 @@
+"""Configuração comum dos testes do Device Agent"""
+import os
+
+# Os testes usam sempre os dispositivos simulados e nenhuma integração externa
+os.environ["MOCK_DEVICES"] = "true"
+for variable in (
+    "DEVICE_TRAFFIC_MODE",
+    "TELEMETRY_PUSH_URL",
+    "TELEMETRY_POLL_INTERVAL_S",
+    "STATE_SNAPSHOT_PATH",
+):
+    os.environ.pop(variable, None)
@@ -0,0 +1,77 @@
+"""Testes do cache de resolução de nomes dos dispositivos"""
+import asyncio
+import socket
+import time
+
+from app.services.telnet_client import TelnetDeviceClient
+
+
+async def _serve():
+    """Servidor TCP local que apenas aceita conexões"""
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_connects_through_next_address_when_first_fails(monkeypatch):
+    client = TelnetDeviceClient()
+    lookups = []
+
+    async def getaddrinfo(host, port, **kwargs):
+        lookups.append(host)
+        return [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", port, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port)),
+        ]
+
+    async def scenario():
+        monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+        server, port = await _serve()
+        try:
+            for _ in range(2):
+                _, writer = await client._open_connection("device.local", port)
+                writer.close()
+        finally:
+            server.close()
+
+    asyncio.run(scenario())
+
+    assert lookups == ["device.local"]
+    assert client.resolved_addresses["device.local"]["addresses"] == ["::1", "127.0.0.1"]
+
+
+def test_expired_addresses_are_resolved_again(monkeypatch):
+    client = TelnetDeviceClient()
+    client.resolved_addresses["device.local"] = {
+        "addresses": ["127.0.0.2"],
+        "expires_at": time.time() - 1,
+    }
+
+    async def getaddrinfo(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+    async def scenario():
+        monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+        server, port = await _serve()
+        try:
+            _, writer = await client._open_connection("device.local", port)
+            writer.close()
+        finally:
+            server.close()
+
+    asyncio.run(scenario())
+
+    assert client.resolved_addresses["device.local"]["addresses"] == ["127.0.0.1"]
+    assert client.resolved_addresses["device.local"]["expires_at"] > time.time()
+
+
+def test_restore_drops_expired_addresses():
+    client = TelnetDeviceClient()
+
+    restored = client.restore_addresses({
+        "fresh.local": {"addresses": ["10.0.0.1", "fd00::1"], "expires_at": time.time() + 60},
+        "stale.local": {"addresses": ["10.0.0.2"], "expires_at": time.time() - 60},
+    })
+
+    assert restored == 1
+    assert set(client.export_addresses()) == {"fresh.local"}
+    assert client.export_addresses()["fresh.local"]["addresses"] == ["10.0.0.1", "fd00::1"]
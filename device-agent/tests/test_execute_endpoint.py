@@ -0,0 +1,88 @@
+"""Testes do /api/execute chamado pelo backend .NET"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import get_command_service
+from app.main import app
+from app.services.command_service import DeviceCommandService
+from app.services.traffic_recorder import TrafficReplayer
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Serviço de comandos com limite padrão de 10 comandos/s sem rajada"""
+    monkeypatch.setenv("DEVICE_RATE_LIMIT_PER_S", "10")
+    monkeypatch.setenv("DEVICE_RATE_LIMIT_BURST", "1")
+    return DeviceCommandService()
+
+
+@pytest.fixture
+def client(service):
+    """Cliente HTTP usando o serviço do teste"""
+    app.dependency_overrides[get_command_service] = lambda: service
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _execute(client, host):
+    return client.post("/api/execute", json={
+        "device_id": "controller",
+        "device_host": host,
+        "device_port": 23,
+        "command": "READ_TEMP",
+    })
+
+
+def test_backend_commands_wait_for_the_host_token(client):
+    started = time.monotonic()
+    responses = [_execute(client, "10.0.0.5") for _ in range(3)]
+    elapsed = time.monotonic() - started
+
+    assert all(response.json()["success"] for response in responses)
+    # Primeiro comando imediato, os outros dois aguardam 0,1 s cada
+    assert elapsed >= 0.18
+
+
+def test_hosts_have_independent_buckets(service):
+    first = service.rate_limiter_for_host("10.0.0.5", 23)
+
+    assert service.rate_limiter_for_host("10.0.0.5", 23) is first
+    assert service.rate_limiter_for_host("10.0.0.6", 23) is not first
+
+
+def test_registry_devices_share_their_bucket(service):
+    assert service.rate_limiter_for_host("192.168.1.102", 23) is service.rate_limiters["irrigation-system-001"]
+
+
+def test_zero_rate_disables_the_default_limit(monkeypatch):
+    monkeypatch.setenv("DEVICE_RATE_LIMIT_PER_S", "0")
+
+    assert DeviceCommandService().rate_limiter_for_host("10.0.0.5", 23) is None
+
+
+def test_backend_commands_are_recorded(tmp_path, monkeypatch):
+    trace = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("DEVICE_TRAFFIC_MODE", "record")
+    monkeypatch.setenv("DEVICE_TRAFFIC_FILE", str(trace))
+    service = DeviceCommandService()
+    app.dependency_overrides[get_command_service] = lambda: service
+    try:
+        response = TestClient(app).post("/api/execute", json={
+            "device_id": "irrigation",
+            "device_host": "10.0.0.7",
+            "device_port": 2323,
+            "command": "STATUS",
+            "parameters": {"param1": "3"},
+        })
+    finally:
+        app.dependency_overrides.clear()
+        service.telnet_client.close()
+
+    exchanges = TrafficReplayer(str(trace)).exchanges
+
+    assert response.json()["response"] == "OK ZONE=3 STATUS=ACTIVE"
+    assert [(exchange.device_url, exchange.command) for exchange in exchanges] == [
+        ("telnet://10.0.0.7:2323", "STATUS 3\r")
+    ]
@@ -0,0 +1,46 @@
+"""Testes da consulta à frota (/api/fleet/query)"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import get_command_service
+from app.main import app
+from app.services.command_service import DeviceCommandService
+
+
+@pytest.fixture
+def client():
+    """Cliente HTTP com um serviço de comandos novo por teste"""
+    service = DeviceCommandService()
+    app.dependency_overrides[get_command_service] = lambda: service
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_index_contains_only_read_operations():
+    service = DeviceCommandService()
+
+    assert "READ_TEMPERATURE" in service.operation_index
+    assert "STOP_IRRIGATION" not in service.operation_index
+    assert "EXPORT_LOG" not in service.operation_index
+
+
+def test_read_operation_returns_results_and_aggregates(client):
+    response = client.post("/api/fleet/query", json={"operation": "READ_TEMPERATURE"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert {result["device_id"] for result in body["results"]} == {"sensor-weather-001", "datalogger-001"}
+    assert body["aggregates"]["count"] == 2
+    assert body["aggregates"]["failures"] == 0
+
+
+def test_control_operation_is_rejected(client):
+    response = client.post("/api/fleet/query", json={"operation": "STOP_IRRIGATION"})
+
+    assert response.status_code == 400
+
+
+def test_unknown_operation_returns_404(client):
+    response = client.post("/api/fleet/query", json={"operation": "UNKNOWN"})
+
+    assert response.status_code == 404
@@ -0,0 +1,53 @@
+"""Testes da limitação de taxa e do compartilhamento de leituras"""
+import asyncio
+
+from app.services.command_service import DeviceCommandService
+
+
+def _counting_service():
+    """Serviço com a chamada ao dispositivo substituída por uma que conta as execuções"""
+    service = DeviceCommandService()
+    calls = []
+
+    async def execute_command(device_url, command, parameters):
+        calls.append((command, tuple(parameters)))
+        await asyncio.sleep(0.01)
+        return True, f"{command} OK"
+
+    service.telnet_client.execute_command = execute_command
+    return service, calls
+
+
+def test_reads_waiting_for_token_share_one_device_call():
+    service, calls = _counting_service()
+
+    async def scenario():
+        # O controle consome o único token do dispositivo (1/s, burst 1)
+        await service.execute_command("irrigation-system-001", "STOP_IRRIGATION", {"zone": "1"})
+        return await asyncio.gather(*(
+            service.execute_command("irrigation-system-001", "GET_ZONE_STATUS", {"zone": "1"})
+            for _ in range(5)
+        ))
+
+    results = asyncio.run(scenario())
+
+    assert [command for command, _ in calls] == ["STOP", "STATUS"]
+    assert all(result.success for result in results)
+    assert sum(not result.coalesced for result in results) == 1
+    assert sum(result.coalesced for result in results) == 4
+
+
+def test_reads_with_different_parameters_are_not_shared():
+    service, calls = _counting_service()
+
+    async def scenario():
+        await service.execute_command("irrigation-system-001", "STOP_IRRIGATION", {"zone": "1"})
+        return await asyncio.gather(
+            service.execute_command("irrigation-system-001", "GET_ZONE_STATUS", {"zone": "1"}),
+            service.execute_command("irrigation-system-001", "GET_ZONE_STATUS", {"zone": "2"}),
+        )
+
+    results = asyncio.run(scenario())
+
+    assert sorted(parameters for command, parameters in calls if command == "STATUS") == [("1",), ("2",)]
+    assert not any(result.coalesced for result in results)
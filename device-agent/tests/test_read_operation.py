@@ -0,0 +1,111 @@
+"""Testes da leitura com ETag (/api/devices/{device_id}/operations/{operation})"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import get_command_service
+from app.main import app
+from app.services.command_service import DeviceCommandService
+
+ZONE_STATUS_URL = "/api/devices/irrigation-system-001/operations/GET_ZONE_STATUS"
+
+
+@pytest.fixture
+def service():
+    """Serviço de comandos novo por teste"""
+    return DeviceCommandService()
+
+
+@pytest.fixture
+def client(service):
+    """Cliente HTTP usando o serviço do teste"""
+    app.dependency_overrides[get_command_service] = lambda: service
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_memory_hit_is_flagged_as_cache_not_coalesced(client):
+    first = client.get(ZONE_STATUS_URL, params={"zone": "1"})
+    second = client.get(ZONE_STATUS_URL, params={"zone": "1"})
+
+    assert first.status_code == 200
+    assert first.json()["from_cache"] is False
+    assert second.json()["from_cache"] is True
+    assert second.json()["coalesced"] is False
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    not_modified = client.get(
+        ZONE_STATUS_URL,
+        params={"zone": "1"},
+        headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+
+
+def test_readings_with_other_parameters_are_kept_apart(client):
+    zone_1 = client.get(ZONE_STATUS_URL, params={"zone": "1"})
+    zone_2 = client.get(ZONE_STATUS_URL, params={"zone": "2"})
+    zone_1_again = client.get(
+        ZONE_STATUS_URL,
+        params={"zone": "1"},
+        headers={"If-None-Match": zone_1.headers["ETag"]}
+    )
+
+    assert zone_2.json()["from_cache"] is False
+    assert zone_2.headers["ETag"] != zone_1.headers["ETag"]
+    assert zone_1_again.status_code == 304
+
+
+def _restore_zone_reading(service, age_s):
+    """Restaura, como de um snapshot, uma leitura da zona 1 com a idade indicada"""
+    service.restore_state(
+        {
+            "readings": [{
+                "device_id": "irrigation-system-001",
+                "operation": "GET_ZONE_STATUS",
+                "parameters": ["1"],
+                "data": "OK ZONE=1 STATUS=RESTORED",
+                "value": None,
+                "sampled_at": time.time() - age_s,
+                "version": 1,
+            }]
+        },
+        registry_matches=True
+    )
+
+
+def test_restored_reading_is_served_under_its_own_age_limit(client, service):
+    _restore_zone_reading(service, age_s=60)
+
+    body = client.get(ZONE_STATUS_URL, params={"zone": "1"}).json()
+
+    assert body["from_cache"] is True
+    assert body["restored"] is True
+    assert body["data"] == "OK ZONE=1 STATUS=RESTORED"
+
+
+def test_restored_reading_older_than_limit_reads_the_device(client, service):
+    _restore_zone_reading(service, age_s=service.restored_max_age_s + 60)
+
+    body = client.get(ZONE_STATUS_URL, params={"zone": "1"}).json()
+
+    assert body["from_cache"] is False
+    assert body["restored"] is False
+    assert body["data"] != "OK ZONE=1 STATUS=RESTORED"
+    assert service.telemetry.get("irrigation-system-001", "GET_ZONE_STATUS", ("1",)).restored is False
+
+
+def test_changes_report_parameters_of_each_reading(client):
+    client.get(ZONE_STATUS_URL, params={"zone": "1"})
+    client.get(ZONE_STATUS_URL, params={"zone": "2"})
+
+    changes = client.post("/api/telemetry/changes", json={}).json()["changes"]
+    known = [
+        {key: change[key] for key in ("device_id", "operation", "parameters", "version")}
+        for change in changes
+    ]
+    unchanged = client.post("/api/telemetry/changes", json={"versions": known}).json()["changes"]
+
+    assert sorted(change["parameters"] for change in changes) == [["1"], ["2"]]
+    assert unchanged == []
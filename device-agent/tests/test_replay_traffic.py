@@ -0,0 +1,62 @@
+"""Testes do driver que reenvia uma gravação de tráfego ao agente"""
+import asyncio
+import json
+
+import httpx
+
+from app.api.routes import get_command_service
+from app.main import app
+from app.services.command_service import DeviceCommandService
+from app.services.traffic_recorder import TrafficReplayer
+from tools.replay_traffic import build_request, replay
+
+
+def _write_trace(path, exchanges):
+    with open(path, "w", encoding="utf-8") as trace:
+        for offset, url, command, response in exchanges:
+            trace.write(json.dumps({"t": offset, "u": url, "c": command, "ok": True, "r": response, "l": 0.01}) + "\n")
+
+
+def test_build_request_splits_command_and_parameters(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    _write_trace(path, [(0.0, "telnet://10.0.0.7:2323", "STATUS 3 A\r", "OK")])
+
+    request = build_request(TrafficReplayer(str(path)).exchanges[0])
+
+    assert request["device_host"] == "10.0.0.7"
+    assert request["device_port"] == 2323
+    assert request["command"] == "STATUS"
+    assert request["parameters"] == {"param1": "3", "param2": "A"}
+
+
+def test_replay_follows_recorded_offsets(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    _write_trace(path, [
+        (1.0, "telnet://10.0.0.7:23", "READ_TEMP\r", "OK TEMP=21C"),
+        (1.2, "telnet://10.0.0.8:23", "STATUS 2\r", "OK ZONE=2"),
+        (1.4, "telnet://10.0.0.7:23", "READ_TEMP\r", "OK TEMP=22C"),
+    ])
+    monkeypatch.setenv("DEVICE_TRAFFIC_MODE", "replay")
+    monkeypatch.setenv("DEVICE_TRAFFIC_FILE", str(path))
+    monkeypatch.setenv("DEVICE_REPLAY_LATENCY_SCALE", "0")
+    monkeypatch.setenv("DEVICE_RATE_LIMIT_PER_S", "0")
+    service = DeviceCommandService()
+    app.dependency_overrides[get_command_service] = lambda: service
+    exchanges = TrafficReplayer(str(path)).exchanges
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+            return await replay(exchanges, client, speed=2.0)
+
+    try:
+        report = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert report.sent == 3
+    assert report.errors == 0
+    assert report.mismatches == 0
+    # 0,4 s gravados a velocidade 2x; a primeira troca sai imediatamente
+    assert 0.19 <= report.duration_s < 1.0
+    assert len(report.latencies_s) == 3
@@ -0,0 +1,134 @@
+"""Testes do snapshot local do estado do agente"""
+import asyncio
+import time
+
+import pytest
+
+from app.services import state_snapshot
+from app.services.command_service import DeviceCommandService
+from app.services.state_snapshot import StateSnapshotFile
+
+
+@pytest.fixture
+def snapshot_env(tmp_path, monkeypatch):
+    """Ativa o snapshot em um diretório temporário com gravação frequente"""
+    path = tmp_path / "state.json.gz"
+    monkeypatch.setenv("STATE_SNAPSHOT_PATH", str(path))
+    monkeypatch.setenv("STATE_SNAPSHOT_INTERVAL_S", "0.05")
+    return path
+
+
+@pytest.mark.parametrize("state", [
+    {"device_health": {"sensor-soil-001": "oops"}},
+    {"device_health": [1, 2]},
+    {"device_health": {"sensor-soil-001": {"successes": "3"}}},
+    {"readings": {"device_id": "sensor-soil-001"}},
+    {"readings": [{"device_id": "sensor-weather-001", "operation": "READ_TEMPERATURE",
+                   "parameters": [], "data": "OK", "value": None,
+                   "sampled_at": "ontem", "version": 1}]},
+    {"resolved_addresses": {"device.local": {"addresses": "10.0.0.1", "expires_at": 1e12}}},
+])
+def test_malformed_state_is_rejected_without_partial_restore(state):
+    service = DeviceCommandService()
+    state = {
+        "resolved_addresses": {"other.local": {"addresses": ["10.0.0.9"], "expires_at": time.time() + 60}},
+        **state,
+    }
+
+    with pytest.raises(ValueError):
+        service.restore_state(state, registry_matches=True)
+
+    assert service.telnet_client.resolved_addresses == {}
+    assert service.device_health == {}
+
+
+def test_malformed_snapshot_does_not_stop_periodic_snapshots(snapshot_env):
+    service = DeviceCommandService()
+    StateSnapshotFile(str(snapshot_env)).save(
+        {"device_health": {"sensor-soil-001": "oops"}},
+        service.registry_fingerprint
+    )
+    written_at = snapshot_env.stat().st_mtime_ns
+
+    async def scenario():
+        await service.start()
+        await asyncio.sleep(0.2)
+        snapshot_alive = not service._snapshot_task.done()
+        await service.aclose()
+        return snapshot_alive
+
+    assert asyncio.run(scenario()) is True
+    assert snapshot_env.stat().st_mtime_ns != written_at
+    assert StateSnapshotFile(str(snapshot_env)).load(service.registry_fingerprint)["state"]["device_health"] == {}
+
+
+def test_cancel_task_logs_earlier_failure(caplog):
+    async def failing():
+        raise AttributeError("falha anterior")
+
+    async def scenario():
+        task = asyncio.create_task(failing())
+        await asyncio.sleep(0)
+        await DeviceCommandService._cancel_task(task)
+
+    asyncio.run(scenario())
+
+    assert "terminou com erro" in caplog.text
+
+
+def test_save_and_load_round_trip(tmp_path):
+    snapshot = StateSnapshotFile(str(tmp_path / "state.json.gz"))
+    state = {"readings": [{"device_id": "sensor-weather-001", "value": 21.5}]}
+
+    size = snapshot.save(state, "registro-a")
+    loaded = snapshot.load("registro-a")
+
+    assert size == (tmp_path / "state.json.gz").stat().st_size
+    assert loaded == {"state": state, "registry_matches": True}
+    assert [path.name for path in tmp_path.iterdir()] == ["state.json.gz"]
+
+
+def test_load_reports_registry_mismatch(tmp_path):
+    snapshot = StateSnapshotFile(str(tmp_path / "state.json.gz"))
+    snapshot.save({"readings": []}, "registro-a")
+
+    assert snapshot.load("registro-b")["registry_matches"] is False
+
+
+def test_load_rejects_other_format_version(tmp_path, monkeypatch):
+    snapshot = StateSnapshotFile(str(tmp_path / "state.json.gz"))
+    monkeypatch.setattr(state_snapshot, "SNAPSHOT_FORMAT_VERSION", 1)
+    snapshot.save({"readings": []}, "registro-a")
+    monkeypatch.undo()
+
+    assert snapshot.load("registro-a") is None
+
+
+def test_load_rejects_snapshot_older_than_max_age(tmp_path, monkeypatch):
+    snapshot = StateSnapshotFile(str(tmp_path / "state.json.gz"), max_age_s=60)
+    monkeypatch.setattr(time, "time", lambda: 1_000_000.0)
+    snapshot.save({"readings": []}, "registro-a")
+    monkeypatch.setattr(time, "time", lambda: 1_000_120.0)
+
+    assert snapshot.load("registro-a") is None
+
+
+def test_load_rejects_unreadable_file(tmp_path):
+    path = tmp_path / "state.json.gz"
+    path.write_bytes(b"not gzip")
+
+    assert StateSnapshotFile(str(path)).load("registro-a") is None
+    assert StateSnapshotFile(str(tmp_path / "missing.json.gz")).load("registro-a") is None
+
+
+def test_concurrent_saves_leave_a_valid_snapshot(tmp_path):
+    snapshot = StateSnapshotFile(str(tmp_path / "state.json.gz"))
+    states = [{"readings": [{"index": index, "data": "x" * 50000}]} for index in range(8)]
+
+    async def scenario():
+        await asyncio.gather(*(asyncio.to_thread(snapshot.save, state, "registro-a") for state in states))
+
+    asyncio.run(scenario())
+
+    assert snapshot.load("registro-a")["state"] in states
+    assert [path.name for path in tmp_path.iterdir()] == ["state.json.gz"]
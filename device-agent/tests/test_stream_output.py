@@ -0,0 +1,166 @@
+"""Testes da saída em fluxo (/api/execute/stream)"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import get_command_service
+from app.main import app
+from app.services.command_service import DeviceCommandService
+from app.services.telnet_client import TelnetDeviceClient
+
+
+@pytest.fixture
+def real_client(monkeypatch):
+    """Cliente Telnet sem mock, para conexões TCP locais"""
+    monkeypatch.setenv("MOCK_DEVICES", "false")
+    return TelnetDeviceClient(timeout=2.0)
+
+
+async def _collect(output):
+    return b"".join([chunk async for chunk in output])
+
+
+async def _serve(payloads, handler_done=None):
+    """Servidor TCP local que envia cada payload em uma escrita separada e fica aberto"""
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r")
+        for payload in payloads:
+            writer.write(payload)
+            await writer.drain()
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(1)
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"telnet://127.0.0.1:{port}"
+
+
+def test_end_marker_split_across_reads(real_client):
+    async def scenario():
+        server, url = await _serve([b"line1\r\nE", b"ND\rtrailing"])
+        async with server:
+            success, output = await real_client.open_stream(
+                url, "DUMP_LOG", [], end_marker="END\r", idle_timeout=1.0, chunk_size=4
+            )
+            assert success
+            return await _collect(output)
+
+    assert asyncio.run(scenario()) == b"line1\r\n"
+
+
+def test_idle_timeout_ends_the_stream(real_client, caplog):
+    async def scenario():
+        server, url = await _serve([b"partial"])
+        async with server:
+            success, output = await real_client.open_stream(
+                url, "DUMP_LOG", [], end_marker="END\r", idle_timeout=0.2
+            )
+            assert success
+            return await _collect(output)
+
+    assert asyncio.run(scenario()) == b"partial"
+    assert "ociosidade" in caplog.text
+
+
+class _FakeWriter:
+    def __init__(self, drain_error=None):
+        self.drain_error = drain_error
+        self.closed = False
+
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        if self.drain_error:
+            raise self.drain_error
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+class _ResettingReader:
+    def __init__(self):
+        self.reads = 0
+
+    async def read(self, size):
+        self.reads += 1
+        if self.reads == 1:
+            return b"first block"
+        raise ConnectionResetError("Connection reset by peer")
+
+
+def test_connection_reset_mid_stream_ends_the_stream(real_client, monkeypatch, caplog):
+    writer = _FakeWriter()
+
+    async def open_connection(host, port):
+        return _ResettingReader(), writer
+
+    monkeypatch.setattr(real_client, "_open_connection", open_connection)
+
+    async def scenario():
+        success, output = await real_client.open_stream("telnet://10.0.0.9:23", "DUMP_LOG", [])
+        assert success
+        return await _collect(output)
+
+    assert asyncio.run(scenario()) == b"first block"
+    assert writer.closed
+    assert "interrompida" in caplog.text
+
+
+def test_send_failure_closes_the_connection(real_client, monkeypatch):
+    writer = _FakeWriter(drain_error=BrokenPipeError("Broken pipe"))
+
+    async def open_connection(host, port):
+        return _ResettingReader(), writer
+
+    monkeypatch.setattr(real_client, "_open_connection", open_connection)
+
+    success, error = asyncio.run(real_client.open_stream("telnet://10.0.0.9:23", "DUMP_LOG", []))
+
+    assert success is False
+    assert "Broken pipe" in error
+    assert writer.closed
+
+
+@pytest.fixture
+def service():
+    service = DeviceCommandService()
+    app.dependency_overrides[get_command_service] = lambda: service
+    yield service
+    app.dependency_overrides.clear()
+
+
+def _stream(operation):
+    return TestClient(app).post("/api/execute/stream", json={
+        "device_id": "datalogger-001",
+        "operation": operation,
+        "parameters": {"lines": "3"},
+    })
+
+
+def test_stream_endpoint_returns_output(service):
+    response = _stream("EXPORT_LOG")
+
+    assert response.status_code == 200
+    assert response.text
+
+
+def test_stream_endpoint_rejects_non_stream_operation(service):
+    assert _stream("READ_TEMPERATURE").status_code == 404
+
+
+def test_stream_endpoint_reports_connection_failure(service, monkeypatch):
+    async def failing_open_stream(*args, **kwargs):
+        return False, "Erro de comunicação com dispositivo"
+
+    monkeypatch.setattr(service.telnet_client, "open_stream", failing_open_stream)
+
+    response = _stream("EXPORT_LOG")
+
+    assert response.status_code == 502
+    assert response.json()["detail"] == "Erro de comunicação com dispositivo"
@@ -0,0 +1,132 @@
+"""Testes do envio de telemetria e das leituras periódicas"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.command_service import DeviceCommandService
+from app.services.telemetry_push import TelemetryPushPipeline
+
+
+def test_overflow_is_spilled_outside_the_event_loop(tmp_path, monkeypatch):
+    pipeline = TelemetryPushPipeline(
+        "http://backend.invalid/readings",
+        batch_size=2,
+        queue_size=1,
+        spill_dir=str(tmp_path)
+    )
+    spill_threads = []
+    spill = pipeline._spill
+
+    def recording_spill(body):
+        spill_threads.append(threading.get_ident())
+        spill(body)
+
+    monkeypatch.setattr(pipeline, "_spill", recording_spill)
+
+    async def scenario():
+        for index in range(3):
+            pipeline.submit({"value": index})
+        assert spill_threads == []
+        await asyncio.gather(*pipeline._spill_tasks)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+
+    assert len(spill_threads) == 1
+    assert spill_threads[0] != loop_thread
+    assert len(list(tmp_path.glob("batch-*.json.gz"))) == 1
+
+
+def test_poll_skips_parameterized_reads_without_poll_parameters():
+    service = DeviceCommandService()
+
+    targets = service._build_poll_targets(service.devices)
+
+    assert ("sensor-weather-001", "READ_TEMPERATURE", {}) in targets
+    assert ("irrigation-system-001", "GET_ZONE_STATUS", {"zone": "1"}) in targets
+    assert ("irrigation-system-001", "GET_ZONE_STATUS", {"zone": "2"}) in targets
+    assert all(operation != "READ_RAINFALL" for _, operation, _ in targets)
+    assert all(service.is_read_operation(device_id, operation) for device_id, operation, _ in targets)
+
+
+def _spilled(path):
+    return sorted(path.glob("batch-*.json.gz"))
+
+
+def test_stop_spills_remaining_batches_after_first_failure(tmp_path, monkeypatch):
+    pipeline = TelemetryPushPipeline("http://backend.invalid/readings", batch_size=1, spill_dir=str(tmp_path))
+    posts = []
+
+    async def failing_post(body):
+        posts.append(body)
+        return False
+
+    monkeypatch.setattr(pipeline, "_post", failing_post)
+
+    async def scenario():
+        for index in range(5):
+            pipeline.submit({"value": index})
+        await pipeline.stop()
+
+    asyncio.run(scenario())
+
+    assert len(posts) == 1
+    assert len(_spilled(tmp_path)) == 5
+
+
+@pytest.mark.parametrize("cancel_during", ["collect", "post", "spill"])
+def test_cancelled_batch_is_spilled_once(tmp_path, monkeypatch, cancel_during):
+    pipeline = TelemetryPushPipeline(
+        "http://backend.invalid/readings",
+        batch_size=5,
+        flush_interval_s=10.0 if cancel_during == "collect" else 0.0,
+        spill_dir=str(tmp_path)
+    )
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def post(body):
+            # Só o envio em andamento trava; o reenvio do encerramento falha logo
+            if cancel_during == "post" and not started.is_set():
+                started.set()
+                await asyncio.sleep(60)
+            return False
+
+        monkeypatch.setattr(pipeline, "_post", post)
+        spill = pipeline._spill
+        spilling = threading.Event()
+
+        def slow_spill(body):
+            # Cancelamento chega enquanto a thread ainda grava o lote que falhou
+            spilling.set()
+            time.sleep(0.2)
+            spill(body)
+
+        if cancel_during == "spill":
+            monkeypatch.setattr(pipeline, "_spill", slow_spill)
+        await pipeline.start()
+        pipeline.submit({"value": 1})
+        if cancel_during == "post":
+            await asyncio.wait_for(started.wait(), timeout=5)
+        elif cancel_during == "spill":
+            await asyncio.to_thread(spilling.wait, 5)
+        else:
+            await asyncio.sleep(0.05)
+        await pipeline.stop()
+
+    asyncio.run(scenario())
+
+    assert len(_spilled(tmp_path)) == 1
+
+
+def test_pushed_records_carry_parameters():
+    service = DeviceCommandService()
+    records = []
+    service.push_pipeline = type("Pipeline", (), {"submit": staticmethod(records.append)})()
+
+    asyncio.run(service.execute_command("irrigation-system-001", "GET_ZONE_STATUS", {"zone": "2"}))
+
+    assert records[0]["parameters"] == {"zone": "2"}
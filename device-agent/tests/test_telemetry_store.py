@@ -0,0 +1,39 @@
+"""Testes da memória de últimos valores lidos"""
+from app.services.telemetry_store import TelemetryStore
+
+
+def test_parameters_are_part_of_the_key():
+    store = TelemetryStore()
+
+    versions = []
+    for _ in range(3):
+        versions.append((
+            store.update("irrigation", "GET_ZONE_STATUS", ("1",), "ZONE=1 ACTIVE", None).version,
+            store.update("irrigation", "GET_ZONE_STATUS", ("2",), "ZONE=2 IDLE", None).version,
+        ))
+
+    assert versions[0] == versions[1] == versions[2]
+    assert store.get("irrigation", "GET_ZONE_STATUS", ("1",)).data == "ZONE=1 ACTIVE"
+    assert store.get("irrigation", "GET_ZONE_STATUS", ("2",)).data == "ZONE=2 IDLE"
+
+
+def test_changed_since_tells_parameter_sets_apart():
+    store = TelemetryStore()
+    zone_1 = store.update("irrigation", "GET_ZONE_STATUS", ("1",), "ZONE=1 ACTIVE", None)
+    store.update("irrigation", "GET_ZONE_STATUS", ("2",), "ZONE=2 IDLE", None)
+
+    changes = store.changed_since({("irrigation", "GET_ZONE_STATUS", ("1",)): zone_1.version})
+
+    assert [entry.parameters for entry in changes] == [("2",)]
+
+
+def test_restore_keeps_parameter_sets_apart():
+    source = TelemetryStore()
+    source.update("irrigation", "GET_ZONE_STATUS", ("1",), "ZONE=1 ACTIVE", None)
+    source.update("irrigation", "GET_ZONE_STATUS", ("2",), "ZONE=2 IDLE", None)
+
+    store = TelemetryStore()
+    restored = store.restore(source.export())
+
+    assert restored == 2
+    assert store.get("irrigation", "GET_ZONE_STATUS", ("2",)).restored is True
@@ -0,0 +1,106 @@
+"""Testes do filtro de negociação Telnet (IAC)"""
+import random
+
+import pytest
+
+from app.services.telnet_iac import (
+    DO,
+    DONT,
+    IAC,
+    OPT_ECHO,
+    SB,
+    SE,
+    WILL,
+    WONT,
+    TelnetIacFilter,
+)
+
+OPT_TERMINAL_TYPE = 24
+GO_AHEAD = 249
+
+# Negociação inicial, comando de dois bytes, 255 literal e subnegociação com IAC escapado
+STREAM = (
+    bytes([IAC, WILL, OPT_ECHO, IAC, DO, OPT_TERMINAL_TYPE])
+    + b"OK "
+    + bytes([IAC, GO_AHEAD])
+    + b"A" + bytes([IAC, IAC]) + b"B"
+    + bytes([IAC, SB, OPT_TERMINAL_TYPE, 1, IAC, IAC, 7, IAC, SE])
+    + b"TEMP=21C\r"
+)
+EXPECTED_DATA = b"OK A\xffBTEMP=21C\r"
+EXPECTED_REPLIES = bytes([IAC, DO, OPT_ECHO, IAC, WONT, OPT_TERMINAL_TYPE])
+
+
+def _feed_all(iac_filter, chunks):
+    data, replies = b"", b""
+    for chunk in chunks:
+        clean, reply = iac_filter.feed(chunk)
+        data += clean
+        replies += reply
+    return data, replies
+
+
+def test_unaccepted_options_are_refused():
+    assert TelnetIacFilter().feed(bytes([IAC, WILL, OPT_TERMINAL_TYPE])) == (b"", bytes([IAC, DONT, OPT_TERMINAL_TYPE]))
+    assert TelnetIacFilter().feed(bytes([IAC, DO, OPT_ECHO])) == (b"", bytes([IAC, WONT, OPT_ECHO]))
+
+
+def test_accepted_option_is_acknowledged_once():
+    iac_filter = TelnetIacFilter()
+
+    assert iac_filter.feed(bytes([IAC, WILL, OPT_ECHO])) == (b"", bytes([IAC, DO, OPT_ECHO]))
+    assert iac_filter.feed(bytes([IAC, WILL, OPT_ECHO])) == (b"", b"")
+
+
+def test_remote_disable_after_enable_is_confirmed_once():
+    iac_filter = TelnetIacFilter()
+    iac_filter.feed(bytes([IAC, WILL, OPT_ECHO]))
+
+    assert iac_filter.feed(bytes([IAC, WONT, OPT_ECHO])) == (b"", bytes([IAC, DONT, OPT_ECHO]))
+    assert iac_filter.feed(bytes([IAC, WONT, OPT_ECHO])) == (b"", b"")
+
+
+def test_local_option_enable_and_disable():
+    iac_filter = TelnetIacFilter(accept_do=frozenset({OPT_TERMINAL_TYPE}))
+
+    assert iac_filter.feed(bytes([IAC, DO, OPT_TERMINAL_TYPE])) == (b"", bytes([IAC, WILL, OPT_TERMINAL_TYPE]))
+    assert iac_filter.feed(bytes([IAC, DO, OPT_TERMINAL_TYPE])) == (b"", b"")
+    assert iac_filter.feed(bytes([IAC, DONT, OPT_TERMINAL_TYPE])) == (b"", bytes([IAC, WONT, OPT_TERMINAL_TYPE]))
+    assert iac_filter.feed(bytes([IAC, DONT, OPT_TERMINAL_TYPE])) == (b"", b"")
+
+
+def test_subnegotiation_with_escaped_iac_is_removed():
+    for stream in (
+        bytes([IAC, SB, OPT_TERMINAL_TYPE, IAC, IAC, 1, IAC, SE]) + b"OK\r",
+        bytes([IAC, SB, OPT_TERMINAL_TYPE, 1, IAC, IAC, IAC, SE]) + b"OK\r",
+    ):
+        # Bloco pequeno (byte a byte) e bloco grande (busca com find)
+        assert TelnetIacFilter().feed(stream) == (b"OK\r", b"")
+        assert TelnetIacFilter().feed(stream + b"x" * 1024) == (b"OK\r" + b"x" * 1024, b"")
+
+
+def test_stream_in_one_block():
+    assert TelnetIacFilter().feed(STREAM) == (EXPECTED_DATA, EXPECTED_REPLIES)
+
+
+@pytest.mark.parametrize("split", range(1, len(STREAM)))
+def test_sequences_split_across_two_blocks(split):
+    chunks = [STREAM[:split], STREAM[split:]]
+
+    assert _feed_all(TelnetIacFilter(), chunks) == (EXPECTED_DATA, EXPECTED_REPLIES)
+
+
+def test_large_blocks_split_at_random_points():
+    rng = random.Random(7)
+    padding = b"LOG 000123 TEMP=21C HUMIDITY=50%\r\n" * 20
+    stream = (padding + STREAM) * 20
+    # ECHO é confirmado uma única vez; cada pedido da opção recusada recebe sua recusa
+    expected = (
+        (padding + EXPECTED_DATA) * 20,
+        bytes([IAC, DO, OPT_ECHO]) + bytes([IAC, WONT, OPT_TERMINAL_TYPE]) * 20
+    )
+
+    for _ in range(50):
+        points = sorted(rng.sample(range(1, len(stream)), 6))
+        chunks = [stream[start:end] for start, end in zip([0] + points, points + [len(stream)])]
+        assert _feed_all(TelnetIacFilter(), chunks) == expected
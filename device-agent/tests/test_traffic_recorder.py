@@ -0,0 +1,64 @@
+"""Testes da gravação e reprodução de tráfego"""
+import asyncio
+import shutil
+
+from app.services import traffic_recorder
+from app.services.telnet_client import TelnetDeviceClient
+from app.services.traffic_recorder import TrafficRecorder, TrafficReplayer
+
+
+def test_truncated_gzip_recording_is_replayed_up_to_last_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_recorder, "_GZIP_FLUSH_INTERVAL_S", 0.0)
+    path = tmp_path / "trace.jsonl.gz"
+    recorder = TrafficRecorder(str(path))
+    for index in range(3):
+        recorder.record("telnet://a:23", "READ_TEMP\r", True, f"OK TEMP={index}C", 0.01)
+
+    # Simula uma queda: copia o arquivo sem fechar o gravador
+    crashed = tmp_path / "crashed.jsonl.gz"
+    shutil.copy(path, crashed)
+    recorder.close()
+
+    replayer = TrafficReplayer(str(crashed), latency_scale=0)
+
+    assert [exchange.response for exchange in replayer.exchanges] == [
+        "OK TEMP=0C", "OK TEMP=1C", "OK TEMP=2C"
+    ]
+
+
+def test_incomplete_last_line_is_ignored(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    recorder = TrafficRecorder(str(path))
+    recorder.record("telnet://a:23", "READ_TEMP\r", True, "OK TEMP=1C", 0.01)
+    recorder.close()
+    with open(path, "a", encoding="utf-8") as trace:
+        trace.write('{"t":0.5,"u":"telnet://a:2')
+
+    replayer = TrafficReplayer(str(path), latency_scale=0)
+
+    assert len(replayer.exchanges) == 1
+
+
+def test_new_recording_replaces_previous_session(tmp_path):
+    path = tmp_path / "trace.jsonl.gz"
+    for response in ("OK FIRST", "OK SECOND"):
+        recorder = TrafficRecorder(str(path))
+        recorder.record("telnet://a:23", "READ_TEMP\r", True, response, 0.01)
+        recorder.close()
+
+    replayer = TrafficReplayer(str(path), latency_scale=0)
+
+    assert [exchange.response for exchange in replayer.exchanges] == ["OK SECOND"]
+
+
+def test_replay_mode_refuses_streams(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    TrafficRecorder(str(path)).close()
+    monkeypatch.setenv("DEVICE_TRAFFIC_MODE", "replay")
+    monkeypatch.setenv("DEVICE_TRAFFIC_FILE", str(path))
+    client = TelnetDeviceClient()
+
+    success, output = asyncio.run(client.open_stream("telnet://a:23", "DUMP", ["10"]))
+
+    assert success is False
+    assert "replay" in output
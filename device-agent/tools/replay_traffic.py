@@ -0,0 +1,181 @@
+"""Reenvia uma gravação de tráfego ao agente no ritmo original e mede o resultado
+
+Uso (a partir de device-agent/):
+    python tools/replay_traffic.py gravacao.jsonl[.gz] [--agent URL] [--speed FATOR] [--timeout SEGUNDOS]
+
+Lê uma gravação feita com DEVICE_TRAFFIC_MODE=record e envia cada troca ao
+POST /api/execute do agente (o mesmo chamado pelo backend) no instante gravado,
+dividido por --speed (2 = duas vezes mais rápido). O envio não espera as
+respostas anteriores, então a carga segue a gravação mesmo quando o agente
+fica lento. Ao final, imprime a vazão, as latências (p50/p95/p99) comparadas
+com as gravadas, os erros e as respostas que divergem da gravação.
+
+Para comparar builds sem acessar os dispositivos, inicie o agente com
+DEVICE_TRAFFIC_MODE=replay e a mesma gravação em DEVICE_TRAFFIC_FILE.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.telnet_client import TelnetDeviceClient  # noqa: E402
+from app.services.traffic_recorder import TrafficExchange, TrafficReplayer  # noqa: E402
+
+
+@dataclass
+class ReplayReport:
+    """Resultado de uma reprodução"""
+    sent: int = 0
+    errors: int = 0                  # Falhas HTTP ou de conexão com o agente
+    mismatches: int = 0              # Respostas diferentes da gravação
+    duration_s: float = 0.0
+    max_lag_s: float = 0.0           # Maior atraso de envio em relação ao instante gravado
+    latencies_s: List[float] = field(default_factory=list)
+    recorded_latencies_s: List[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Requisições por segundo durante a reprodução"""
+        return self.sent / self.duration_s if self.duration_s > 0 else 0.0
+
+
+def build_request(exchange: TrafficExchange) -> Dict:
+    """
+    Monta o corpo do /api/execute a partir de uma troca gravada
+
+    Args:
+        exchange: Troca gravada
+
+    Returns:
+        Corpo da requisição (comando e parâmetros separados por espaço)
+    """
+    host, port = TelnetDeviceClient._parse_device_url(exchange.device_url)
+    command, *parameters = exchange.command.rstrip("\r").split(" ")
+    return {
+        "device_id": exchange.device_url,
+        "device_host": host,
+        "device_port": port,
+        "command": command,
+        "parameters": {f"param{index}": value for index, value in enumerate(parameters, start=1)},
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentil por posição mais próxima (0 para lista vazia)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def replay(
+    exchanges: List[TrafficExchange],
+    client: httpx.AsyncClient,
+    speed: float = 1.0
+) -> ReplayReport:
+    """
+    Envia as trocas ao agente nos instantes gravados
+
+    Args:
+        exchanges: Trocas gravadas
+        client: Cliente HTTP apontado para o agente
+        speed: Fator de aceleração dos instantes gravados (0 = sem espera)
+
+    Returns:
+        Relatório da reprodução
+    """
+    report = ReplayReport()
+    ordered = sorted(exchanges, key=lambda exchange: exchange.offset_s)
+    if not ordered:
+        return report
+
+    first_offset = ordered[0].offset_s
+    scale = 1.0 / speed if speed > 0 else 0.0
+
+    async def send(exchange: TrafficExchange) -> None:
+        started = time.monotonic()
+        try:
+            response = await client.post("/api/execute", json=build_request(exchange))
+            response.raise_for_status()
+            result = response.json()
+        except httpx.HTTPError as e:
+            report.errors += 1
+            print(f"    erro em {exchange.device_url} {exchange.command!r}: {e}", file=sys.stderr)
+            return
+        finally:
+            report.latencies_s.append(time.monotonic() - started)
+
+        if result["success"] != exchange.success or (
+            exchange.success and result.get("response") != exchange.response
+        ):
+            report.mismatches += 1
+
+    started = time.monotonic()
+    tasks = []
+    for exchange in ordered:
+        due = started + (exchange.offset_s - first_offset) * scale
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            report.max_lag_s = max(report.max_lag_s, -delay)
+        report.sent += 1
+        report.recorded_latencies_s.append(exchange.latency_s)
+        tasks.append(asyncio.create_task(send(exchange)))
+
+    await asyncio.gather(*tasks)
+    report.duration_s = time.monotonic() - started
+    return report
+
+
+def print_report(report: ReplayReport, recorded_span_s: float) -> None:
+    """Imprime o resumo da reprodução"""
+    print(
+        f"{report.sent} requisições em {report.duration_s:.2f} s "
+        f"(gravação: {recorded_span_s:.2f} s), {report.throughput:.1f} req/s"
+    )
+    print(f"Atraso máximo de envio: {report.max_lag_s * 1000:.1f} ms")
+    print("Latência (ms)      p50      p95      p99")
+    for label, values in (("agente", report.latencies_s), ("gravada", report.recorded_latencies_s)):
+        print(
+            f"  {label:<12}" + "".join(
+                f"{percentile(values, fraction) * 1000:9.1f}" for fraction in (0.50, 0.95, 0.99)
+            )
+        )
+    print(f"Erros: {report.errors}, respostas divergentes da gravação: {report.mismatches}")
+
+
+async def main(path: str, agent_url: str, speed: float, timeout: Optional[float]) -> ReplayReport:
+    """Carrega a gravação, reproduz no agente e imprime o relatório"""
+    exchanges = TrafficReplayer(path, latency_scale=0).exchanges
+    if not exchanges:
+        print(f"Nenhuma troca gravada em {path}")
+        return ReplayReport()
+
+    print(f"Reproduzindo {len(exchanges)} trocas de {path} em {agent_url} (velocidade {speed}x)")
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=agent_url, timeout=timeout, limits=limits) as client:
+        report = await replay(exchanges, client, speed)
+
+    offsets = [exchange.offset_s for exchange in exchanges]
+    print_report(report, max(offsets) - min(offsets))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reenvia uma gravação de tráfego ao agente")
+    parser.add_argument("trace", help="Arquivo de gravação (.jsonl ou .jsonl.gz)")
+    parser.add_argument("--agent", default="http://localhost:8000", help="URL base do agente")
+    parser.add_argument("--speed", type=float, default=1.0, help="Fator de aceleração (0 = sem espera)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout de cada requisição (s)")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args.trace, args.agent, args.speed, args.timeout))
+    sys.exit(1 if report.errors else 0)
@@ -0,0 +1,55 @@
+"""Servidor local que simula o endpoint de telemetria do backend
+
+Uso:
+    python tools/telemetry_stub_server.py [porta] [--slow SEGUNDOS] [--fail]
+
+Depois, inicie o agente com TELEMETRY_PUSH_URL=http://localhost:<porta>/api/telemetry.
+Cada lote recebido é descomprimido e resumido no console. --slow atrasa as
+respostas e --fail responde 503, para exercitar a gravação em disco.
+"""
+import gzip
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SLOW_S = float(sys.argv[sys.argv.index("--slow") + 1]) if "--slow" in sys.argv else 0.0
+FAIL = "--fail" in sys.argv
+
+
+class TelemetryStubHandler(BaseHTTPRequestHandler):
+    """Recebe lotes de telemetria (JSON com gzip) e imprime um resumo"""
+
+    protocol_version = "HTTP/1.1"  # Mantém a conexão keep-alive do agente
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(body)
+        else:
+            raw = body
+        readings = json.loads(raw)["readings"]
+
+        print(
+            f"{time.strftime('%H:%M:%S')} lote com {len(readings)} registros "
+            f"({len(body)} bytes comprimidos, {len(raw)} bytes JSON)"
+        )
+        for reading in readings[:3]:
+            print(f"    {reading['device_id']} {reading['operation']}: {reading['data'] or reading['error']}")
+
+        if SLOW_S:
+            time.sleep(SLOW_S)
+
+        status = 503 if FAIL else 202
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 9100
+    print(f"Stub de telemetria em http://localhost:{port}/api/telemetry")
+    ThreadingHTTPServer(("0.0.0.0", port), TelemetryStubHandler).serve_forever()